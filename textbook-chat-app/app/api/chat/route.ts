@@ -2,7 +2,7 @@ import { type NextRequest, NextResponse } from "next/server"
 
 export async function POST(req: NextRequest) {
   try {
-    const { message, token } = await req.json()
+    const { message, token, stream, textbookId } = await req.json()
 
     // Prepare headers for the backend request
     const headers: Record<string, string> = {
@@ -15,10 +15,10 @@ export async function POST(req: NextRequest) {
     }
 
     // Send the message to the backend API
-    const response = await fetch("http://localhost:8000/chat", {
+    const response = await fetch(`http://localhost:8000/chat${stream ? "/stream" : ""}`, {
       method: "POST",
       headers,
-      body: JSON.stringify({ message }),
+      body: JSON.stringify({ message, textbook_id: textbookId }),
     })
 
     if (!response.ok) {
@@ -26,6 +26,17 @@ export async function POST(req: NextRequest) {
       return NextResponse.json({ error: errorData.detail || "Backend API error" }, { status: response.status })
     }
 
+    // Pass server-sent events straight through so tokens reach the client as they arrive
+    if (stream) {
+      return new Response(response.body, {
+        headers: {
+          "Content-Type": "text/event-stream",
+          "Cache-Control": "no-cache",
+          Connection: "keep-alive",
+        },
+      })
+    }
+
     const data = await response.json()
     return NextResponse.json(data) // Forward the backend response
   } catch (error) {
@@ -33,4 +44,3 @@ export async function POST(req: NextRequest) {
     return NextResponse.json({ error: "Failed to process your request" }, { status: 500 })
   }
 }
-
@@ -55,9 +55,28 @@ export async function POST(req: NextRequest) {
     // ✅ Save it to books.json
     await saveBookMetadata(textbook)
 
+    // Queue background indexing on the backend as the uploading user; the upload doesn't wait for it
+    let ingestionQueued = false
+    try {
+      const authorization = req.headers.get("authorization")
+      const response = await fetch(`http://localhost:8000/textbooks/${textbook.id}/ingest`, {
+        method: "POST",
+        headers: authorization ? { Authorization: authorization } : {},
+      })
+      ingestionQueued = response.ok
+      if (!response.ok) {
+        console.error(`Failed to queue textbook ingestion: ${response.status} ${await response.text()}`)
+      }
+    } catch (error) {
+      console.error("Failed to queue textbook ingestion:", error)
+    }
+
     return NextResponse.json({
       success: true,
-      message: "Textbook uploaded successfully",
+      message: ingestionQueued
+        ? "Textbook uploaded successfully"
+        : "Textbook uploaded, but indexing could not be queued",
+      ingestionQueued,
       textbook,
     })
   } catch (error) {
@@ -0,0 +1,74 @@
+"""
+Offline comparison of chunking strategies: index size, ingestion time and retrieval quality.
+
+Each strategy is indexed into a throwaway in-memory Chroma collection. Retrieval quality is the
+recall of expected PDF pages for a questions file in the format used by eval_compressors.
+Pass --fake-embeddings to measure size and time without calling the embedding API (recall is then
+meaningless).
+
+Usage (from textbook-chat-app):
+    python -m backend.benchmarks.bench_chunking data/Physics-WEB_Sab7RrQ.pdf --questions questions.json
+"""
+import argparse
+import json
+import time
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_openai import OpenAIEmbeddings
+from PyPDF2 import PdfReader
+
+import backend.bookmark as bookmark
+from backend.benchmarks.eval_compressors import evaluate
+from backend.chunking import CHUNK_STRATEGIES, chunk_documents
+from backend.config import settings
+from backend.extraction import iter_chapter_documents
+from backend.ingestion import index_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("textbook_path")
+    parser.add_argument("--questions")
+    parser.add_argument("--strategies", nargs="+", default=list(CHUNK_STRATEGIES), choices=CHUNK_STRATEGIES)
+    parser.add_argument("--chunk-size", type=int, default=settings.CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=settings.CHUNK_OVERLAP)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        embeddings = DeterministicFakeEmbedding(size=3072)
+    else:
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+
+    reader = PdfReader(args.textbook_path)
+    pages = list(iter_chapter_documents(reader, bookmark.build_bookmarks(reader)))
+    questions = None
+    if args.questions:
+        with open(args.questions, "r") as f:
+            questions = json.load(f)
+
+    client = chromadb.EphemeralClient()
+    print(f"{'strategy':<10} {'chunks':>7} {'text MB':>8} {'vector MB':>10} {'ingest s':>9} {'recall':>7}")
+    for strategy in args.strategies:
+        chunks = list(chunk_documents(pages, strategy, args.chunk_size, args.chunk_overlap))
+        name = f"bench-{strategy}"
+        collection = client.get_or_create_collection(name=name)
+
+        start = time.perf_counter()
+        index_documents(collection, embeddings, chunks)
+        elapsed = time.perf_counter() - start
+
+        text_mb = sum(len(c.page_content.encode("utf-8")) for c in chunks) / 1e6
+        vector_mb = len(chunks) * len(embeddings.embed_query("size")) * 4 / 1e6
+        recall = float("nan")
+        if questions:
+            vector_store = Chroma(client=client, collection_name=name, embedding_function=embeddings)
+            recall = evaluate(vector_store.as_retriever(search_kwargs={"k": settings.RETRIEVER_K}), questions)["recall"]
+        print(f"{strategy:<10} {len(chunks):>7} {text_mb:>8.2f} {vector_mb:>10.2f} {elapsed:>9.1f} {recall:>7.3f}")
+        client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
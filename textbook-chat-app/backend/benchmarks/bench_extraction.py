@@ -0,0 +1,43 @@
+"""
+Compares serial and multi-process PDF text extraction.
+
+Usage (from textbook-chat-app):
+    python -m backend.benchmarks.bench_extraction data/Physics-WEB_Sab7RrQ.pdf --workers 2 4 8
+"""
+import argparse
+import os
+import time
+
+from PyPDF2 import PdfReader
+
+import backend.bookmark as bookmark
+from backend.extraction import extract_documents
+
+
+def run(textbook_path, bookmarks, workers):
+    start = time.perf_counter()
+    pages = sum(1 for _ in extract_documents(textbook_path, bookmarks, workers))
+    return pages, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("textbook_path")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bookmarks = bookmark.build_bookmarks(PdfReader(args.textbook_path))
+    print(f"bookmarks: {bookmarks['chapter_num']} chapters in {time.perf_counter() - start:.2f}s")
+
+    pages, serial = run(args.textbook_path, bookmarks, 1)
+    print(f"workers=1: {pages} pages in {serial:.2f}s ({pages / serial:.1f} pages/sec)")
+
+    for workers in args.workers:
+        pages, elapsed = run(args.textbook_path, bookmarks, workers)
+        print(f"workers={workers}: {pages} pages in {elapsed:.2f}s "
+              f"({pages / elapsed:.1f} pages/sec, {serial / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures per-request overhead of building the LLM client and agent graph on every /chat call
+versus reusing one compiled graph built at startup.
+
+A fake chat model and retriever are used so only framework overhead is measured.
+
+Usage (from textbook-chat-app):
+    python -m backend.benchmarks.bench_graph_build --requests 200 --agent parallel
+"""
+import argparse
+import itertools
+import os
+import time
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.retrievers import BaseRetriever
+from langchain_openai import ChatOpenAI
+
+from backend.graph import build_graph
+from backend.tools import get_tools
+
+
+class FakeToolChatModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class FakeRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query, *, run_manager):
+        return [Document(page_content="Newton's second law: F = ma")]
+
+
+def fake_llm():
+    return FakeToolChatModel(messages=itertools.repeat(AIMessage(content="What do you think?")))
+
+
+def per_request(requests, agent):
+    start = time.perf_counter()
+    for i in range(requests):
+        # Mirrors the old handler: a new client, tools and graph for every message
+        ChatOpenAI(model="gpt-4o", temperature=0, streaming=True)
+        graph = build_graph(fake_llm(), get_tools(FakeRetriever()), agent=agent)
+        graph.invoke({"messages": [HumanMessage(content="hi")]}, {"configurable": {"thread_id": str(i)}})
+    return time.perf_counter() - start
+
+
+def shared(requests, agent):
+    graph = build_graph(fake_llm(), get_tools(FakeRetriever()), checkpointer=None, agent=agent)
+    start = time.perf_counter()
+    for i in range(requests):
+        graph.invoke({"messages": [HumanMessage(content="hi")]}, {"configurable": {"thread_id": str(i)}})
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--agent", choices=["prebuilt", "parallel"], default="prebuilt")
+    args = parser.parse_args()
+
+    # ChatOpenAI validates that a key is set but never calls the API here
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    before = per_request(args.requests, args.agent)
+    after = shared(args.requests, args.agent)
+    print(f"per-request build: {before / args.requests * 1000:.2f} ms/request")
+    print(f"shared graph:      {after / args.requests * 1000:.2f} ms/request")
+    print(f"overhead removed:  {(before - after) / args.requests * 1000:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
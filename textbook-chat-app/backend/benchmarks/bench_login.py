@@ -0,0 +1,66 @@
+"""
+Measures login throughput and event-loop stalls while verifying bcrypt passwords, comparing
+hashing inline on the loop with PasswordHasher's thread pool at several pool sizes and costs.
+
+Usage (from textbook-chat-app):
+    python -m backend.benchmarks.bench_login --logins 64 --rounds 10 12 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import time
+
+import bcrypt
+
+from backend.passwords import PasswordHasher
+
+PASSWORD = "correct horse battery staple"
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.005) -> float:
+    # How late the loop wakes up is how long a concurrent chat request would have stalled
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(verify, logins: int):
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    stall = await monitor
+    assert all(ok for ok, _ in results)
+    return logins / elapsed, stall
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64, help="concurrent logins per run")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)).decode()
+
+        async def inline():
+            return bcrypt.checkpw(PASSWORD.encode(), hashed.encode()), False
+
+        throughput, stall = await run(inline, args.logins)
+        print(f"rounds={rounds} inline:    {throughput:6.1f} logins/sec, worst loop stall {stall * 1000:7.1f}ms")
+
+        for workers in args.workers:
+            hasher = PasswordHasher(rounds=rounds, max_workers=workers)
+            throughput, stall = await run(lambda: hasher.verify(PASSWORD, hashed), args.logins)
+            hasher.shutdown()
+            print(f"rounds={rounds} workers={workers}: {throughput:6.1f} logins/sec, "
+                  f"worst loop stall {stall * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
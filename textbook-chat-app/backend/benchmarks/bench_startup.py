@@ -0,0 +1,79 @@
+"""
+Measures API cold start: the time to import backend.main, and optionally the time for a fresh
+uvicorn process to answer /healthz (live) and /readyz (textbooks warmed up).
+
+Usage (from textbook-chat-app):
+    python -m backend.benchmarks.bench_startup --runs 5
+    python -m backend.benchmarks.bench_startup --runs 3 --serve --port 8010
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT_SNIPPET = "import time; s = time.perf_counter(); import backend.main; print(time.perf_counter() - s)"
+
+
+def time_import():
+    # A fresh interpreter each run so nothing is already in sys.modules
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def time_serve(port, timeout):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        live = time.perf_counter() - start if wait_for(f"http://127.0.0.1:{port}/healthz", deadline) else None
+        ready = time.perf_counter() - start if wait_for(f"http://127.0.0.1:{port}/readyz", deadline) else None
+        return live, ready
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def summarize(label, samples):
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        print(f"{label}: no successful runs")
+        return
+    print(f"{label}: median {statistics.median(samples):.2f}s, min {min(samples):.2f}s, "
+          f"max {max(samples):.2f}s ({len(samples)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="also time /healthz and /readyz on a real server")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    summarize("import backend.main", [time_import() for _ in range(args.runs)])
+
+    if args.serve:
+        results = [time_serve(args.port, args.timeout) for _ in range(args.runs)]
+        summarize("time to /healthz", [live for live, _ in results])
+        summarize("time to /readyz", [ready for _, ready in results])
+
+
+if __name__ == "__main__":
+    main()
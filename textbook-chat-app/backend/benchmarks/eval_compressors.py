@@ -0,0 +1,64 @@
+"""
+Compares retrieval recall and latency of the compression modes against the per-document LLM filter.
+
+The questions file is a JSON list of {"question": str, "pages": [int, ...]}, where pages are the
+1-based PDF pages that answer the question. Recall is the fraction of those pages returned.
+
+Usage (from textbook-chat-app, with an indexed collection):
+    python -m backend.benchmarks.eval_compressors questions.json --modes llm batched embedding lexical
+"""
+import argparse
+import json
+import statistics
+import time
+
+import backend.retriever
+from backend.compressors import COMPRESSOR_MODES
+
+
+def evaluate(retriever, questions):
+    recalls, latencies, returned = [], [], []
+    for item in questions:
+        start = time.perf_counter()
+        documents = retriever.invoke(item["question"])
+        latencies.append(time.perf_counter() - start)
+
+        expected = set(item["pages"])
+        found = {doc.metadata.get("pdf_page") for doc in documents}
+        recalls.append(len(expected & found) / len(expected) if expected else 1.0)
+        returned.append(len(documents))
+
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls),
+        "docs": statistics.mean(returned),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions")
+    parser.add_argument("--textbook-path", default="data/Physics-WEB_Sab7RrQ.pdf")
+    parser.add_argument("--textbook-name", default="Physics")
+    parser.add_argument("--modes", nargs="+", default=list(COMPRESSOR_MODES), choices=COMPRESSOR_MODES)
+    args = parser.parse_args()
+
+    with open(args.questions, "r") as f:
+        questions = json.load(f)
+
+    modes = ["llm"] + [m for m in args.modes if m != "llm"]
+    baseline = None
+    print(f"{'mode':<10} {'recall':>7} {'docs':>5} {'p50 ms':>8} {'p95 ms':>8} {'vs llm':>7}")
+    for mode in modes:
+        retriever = backend.retriever.create_retriever(args.textbook_path, args.textbook_name, compressor=mode)
+        result = evaluate(retriever, questions)
+        baseline = baseline or result
+        speedup = baseline["p50_ms"] / result["p50_ms"] if result["p50_ms"] else float("inf")
+        print(f"{mode:<10} {result['recall']:>7.3f} {result['docs']:>5.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {speedup:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,28 +37,17 @@ def _initialize_ranges(bookmarks_json):
             
             sections[i]["page_range"] = [start_page, end_page]
 
-def initialize_bookmarks(pdf_path, filepath):
+def build_bookmarks(pdf):
     """
-    Creates a new bookmarks.json file from a PDF. It will overwrite any existing file.
+    Builds the chapter/section bookmarks dictionary from an open PDF without touching the disk.
 
     Args:
-        pdf_path (str): Path to the PDF file
-        filepath (str): Path to the bookmarks.json file
+        pdf (PdfReader): Open PDF reader
 
     Returns:
-        None
+        dict: Bookmarks keyed by "chapter N", plus the "chapter_num" count
     """
-    if os.path.exists(filepath):
-        os.remove(filepath)
-        print(f"Removed outdated bookmarks file at {filepath}")
-    
-    print(f"Generating new bookmarks at {filepath}...")
-
-    bookmarks = []
-    
-    with open(pdf_path, "rb") as f:
-        pdf = PdfReader(f)
-        bookmarks = _getBookmarksPageNumbers(pdf)
+    bookmarks = _getBookmarksPageNumbers(pdf)
 
     # print(bookmarks)
 
@@ -102,7 +91,52 @@ def initialize_bookmarks(pdf_path, filepath):
     _initialize_ranges(bookmarks_json)
 
     # print(bookmarks_json)
+    return bookmarks_json
+
+def initialize_bookmarks(pdf_path, filepath):
+    """
+    Creates a new bookmarks.json file from a PDF. It will overwrite any existing file.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        filepath (str): Path to the bookmarks.json file
+
+    Returns:
+        None
+    """
+    if os.path.exists(filepath):
+        os.remove(filepath)
+        print(f"Removed outdated bookmarks file at {filepath}")
     
-    with open(filepath, "w", encoding="utf-8") as f:
+    print(f"Generating new bookmarks at {filepath}...")
+
+    with open(pdf_path, "rb") as f:
+        pdf = PdfReader(f)
+        bookmarks_json = build_bookmarks(pdf)
+    
+    save_bookmarks(bookmarks_json, filepath)
+
+def save_bookmarks(bookmarks_json, filepath):
+    """
+    Writes a bookmarks dictionary to a JSON file, creating its directory if needed.
+
+    The file is written next to its destination and renamed over it, so processes reading it while
+    a book is re-indexed see either the old or the new bookmarks, never a partial file.
+    """
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    staging = f"{filepath}.{os.getpid()}.tmp"
+    with open(staging, "w", encoding="utf-8") as f:
         json.dump(bookmarks_json, f, ensure_ascii=False, indent=4)
-        print(f"Bookmarks saved to {filepath}")
+    os.replace(staging, filepath)
+    print(f"Bookmarks saved to {filepath}")
+
+def load_bookmarks(filepath):
+    """
+    Reads a bookmarks dictionary written by save_bookmarks, or returns None if there isn't one.
+    """
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
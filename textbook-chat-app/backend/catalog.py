@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from backend.config import settings
+
+
+class TextbookNotIndexed(Exception):
+    """
+    Raised when a textbook's collection is empty and ingestion wasn't requested.
+    """
+
+
+@dataclass
+class Textbook:
+    id: str
+    title: str
+    path: str
+    collection: str
+
+
+DEFAULT_TEXTBOOK = Textbook(
+    id=settings.DEFAULT_TEXTBOOK_ID,
+    title="Physics",
+    path="data/Physics-WEB_Sab7RrQ.pdf",
+    collection="Physics",
+)
+
+
+class TextbookCatalog:
+    """
+    Textbooks the backend can serve: the bundled default book plus the PDFs uploaded through the
+    frontend, which are listed in data/books.json and stored under public/.
+    """
+
+    def __init__(self, books_path: str, public_dir: str, default: Textbook) -> None:
+        self.books_path = books_path
+        self.public_dir = public_dir
+        self.default = default
+        self._books: Dict[str, Textbook] = {}
+        self._mtime = None
+
+    def _reload(self) -> None:
+        mtime = os.path.getmtime(self.books_path) if os.path.exists(self.books_path) else None
+        if self._books and mtime == self._mtime:
+            return
+
+        books = {self.default.id: self.default}
+        if mtime is not None:
+            with open(self.books_path, "r", encoding="utf-8") as f:
+                for entry in json.load(f):
+                    books[entry["id"]] = Textbook(
+                        id=entry["id"],
+                        title=entry.get("title", entry["id"]),
+                        path=os.path.join(self.public_dir, entry["fileUrl"].lstrip("/")),
+                        collection=f"book-{entry['id']}",
+                    )
+        self._books = books
+        self._mtime = mtime
+
+    def get(self, textbook_id: str) -> Optional[Textbook]:
+        # Uploads append to books.json while the server runs, so re-read it when it changes
+        self._reload()
+        return self._books.get(textbook_id)
+
+    def all(self):
+        self._reload()
+        return list(self._books.values())
+
+
+class TextbookRegistry:
+    """
+    Loads textbooks on first use and keeps the most recently used ones in an LRU.
+
+    `loader` turns a Textbook into whatever the API needs per book (retriever, tools, graphs) and is
+    run in a worker thread, since building a retriever can be slow. At most `max_loaded` books are
+    held at once; vector memory is capped separately by Chroma's own LRU segment cache.
+    """
+
+    def __init__(self, catalog: TextbookCatalog, loader: Callable[[Textbook], Any], max_loaded: int) -> None:
+        self.catalog = catalog
+        self.loader = loader
+        self.max_loaded = max_loaded
+        self._loaded: "OrderedDict[str, Any]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, textbook_id: str):
+        """
+        Returns the loaded textbook, loading it if needed.
+
+        Raises:
+            KeyError: If the textbook isn't in the catalog
+        """
+        if textbook_id in self._loaded:
+            self._loaded.move_to_end(textbook_id)
+            return self._loaded[textbook_id]
+
+        book = self.catalog.get(textbook_id)
+        if book is None:
+            raise KeyError(textbook_id)
+
+        # Concurrent first requests for the same book share one load
+        lock = self._locks.setdefault(textbook_id, asyncio.Lock())
+        async with lock:
+            if textbook_id not in self._loaded:
+                loaded = await asyncio.to_thread(self.loader, book)
+                self._loaded[textbook_id] = loaded
+                while len(self._loaded) > self.max_loaded:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    print(f"Unloaded textbook {evicted}")
+            self._loaded.move_to_end(textbook_id)
+            return self._loaded[textbook_id]
+
+    def loaded(self):
+        return list(self._loaded.keys())
+
+    def invalidate(self, textbook_id: str) -> None:
+        """
+        Drops a loaded textbook so the next request rebuilds it, e.g. after it was re-indexed.
+        """
+        self._loaded.pop(textbook_id, None)
+
+
+@dataclass
+class LoadedTextbook:
+    book: Textbook
+    retriever: Any
+    graph: Any
+    anonymous_graph: Any
+    loaded_at: float = field(default_factory=time.time)
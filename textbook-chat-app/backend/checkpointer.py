@@ -0,0 +1,217 @@
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+import ormsgpack
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+from backend.config import settings
+from backend.redis_client import binary_redis_client
+
+
+def _thread_key(thread_id: str, checkpoint_ns: str) -> str:
+    return f"checkpoints:{thread_id}:{checkpoint_ns}"
+
+
+def _checkpoint_key(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+    return f"checkpoint:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+
+def _writes_key(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+    return f"checkpoint_writes:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+
+class RedisCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer that keeps per-thread agent state in Redis, so every API worker and pod
+    sees the same conversation state for a thread_id.
+
+    Each checkpoint is a Redis hash, and a sorted set per thread orders the checkpoint ids (uuid6
+    ids sort by creation time). Only the newest `keep_last` checkpoints of a thread are kept, and
+    every key of a thread expires `ttl` seconds after its last update.
+
+    Only the async interface is implemented; the API runs graphs with astream/astream_events.
+    """
+
+    def __init__(self, client=binary_redis_client, ttl: Optional[int] = None, keep_last: int = 10) -> None:
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.keep_last = keep_last
+
+    def _config(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+    async def _load(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> Optional[CheckpointTuple]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id))
+        pipe.hgetall(_writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        saved, writes = await pipe.execute()
+        if not saved:
+            return None
+
+        pending = []
+        for field, value in sorted(writes.items(), key=lambda item: _write_order(item[0])):
+            task_id, channel, type_, data, _ = ormsgpack.unpackb(value)
+            pending.append((task_id, channel, self.serde.loads_typed((type_, data))))
+
+        parent_id = saved.get(b"parent_id", b"").decode()
+        return CheckpointTuple(
+            config=self._config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self.serde.loads_typed((saved[b"type"].decode(), saved[b"checkpoint"])),
+            metadata=self.serde.loads_typed((saved[b"metadata_type"].decode(), saved[b"metadata"])),
+            parent_config=self._config(thread_id, checkpoint_ns, parent_id) if parent_id else None,
+            pending_writes=pending,
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        if not checkpoint_id:
+            latest = await self.client.zrevrange(_thread_key(thread_id, checkpoint_ns), 0, 0)
+            if not latest:
+                return None
+            checkpoint_id = latest[0].decode()
+        return await self._load(thread_id, checkpoint_ns, checkpoint_id)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config is None:
+            thread_keys = [key async for key in self.client.scan_iter(match=_thread_key("*", "*"))]
+        else:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+            thread_keys = [_thread_key(thread_id, checkpoint_ns).encode()]
+
+        before_id = get_checkpoint_id(before) if before else None
+        for thread_key in thread_keys:
+            _, thread_id, checkpoint_ns = thread_key.decode().split(":", 2)
+            for checkpoint_id in await self.client.zrevrange(thread_key, 0, -1):
+                checkpoint_id = checkpoint_id.decode()
+                if before_id and checkpoint_id >= before_id:
+                    continue
+                saved = await self._load(thread_id, checkpoint_ns, checkpoint_id)
+                if saved is None:
+                    continue
+                if filter and not all(saved.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                yield saved
+                if limit is not None:
+                    limit -= 1
+                    if limit <= 0:
+                        return
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
+        thread_key = _thread_key(thread_id, checkpoint_ns)
+        key = _checkpoint_key(thread_id, checkpoint_ns, checkpoint["id"])
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(key, mapping={
+            "type": type_,
+            "checkpoint": serialized,
+            "metadata_type": metadata_type,
+            "metadata": serialized_metadata,
+            "parent_id": config["configurable"].get("checkpoint_id") or "",
+            "created_at": time.time(),
+        })
+        pipe.zadd(thread_key, {checkpoint["id"]: 0})
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+            pipe.expire(thread_key, self.ttl)
+        await pipe.execute()
+
+        await self._prune(thread_id, checkpoint_ns)
+        return self._config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        key = _writes_key(thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"])
+
+        pipe = self.client.pipeline(transaction=True)
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, data = self.serde.dumps_typed(value)
+            field = f"{task_id}:{idx}"
+            packed = ormsgpack.packb([task_id, channel, type_, data, task_path])
+            # Special channels (errors, interrupts) overwrite; regular writes are only saved once
+            if idx < 0:
+                pipe.hset(key, field, packed)
+            else:
+                pipe.hsetnx(key, field, packed)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        thread_key = _thread_key(thread_id, checkpoint_ns)
+        stale = await self.client.zrange(thread_key, 0, -(self.keep_last + 1))
+        if not stale:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        for checkpoint_id in stale:
+            checkpoint_id = checkpoint_id.decode()
+            pipe.delete(_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id))
+            pipe.delete(_writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        pipe.zrem(thread_key, *stale)
+        await pipe.execute()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """
+        Deletes every checkpoint of a thread, e.g. when a user clears their conversation.
+        """
+        keys = [key async for key in self.client.scan_iter(match=f"checkpoint*:{thread_id}:*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+def _write_order(field: bytes) -> Tuple[str, int]:
+    task_id, idx = field.decode().rsplit(":", 1)
+    return task_id, int(idx)
+
+
+def create_checkpointer() -> Optional[RedisCheckpointSaver]:
+    """
+    Returns the checkpointer selected by settings.CHECKPOINTER: a Redis-backed saver shared by all
+    workers, or None to run graphs without one.
+
+    Chat history in Redis is the source of truth for what the agent sees, so no checkpointer is
+    needed by default. There is no in-process option, because a MemorySaver kept for the life of
+    a worker would hold every thread's state forever.
+    """
+    if settings.CHECKPOINTER == "redis":
+        return RedisCheckpointSaver(ttl=settings.CHECKPOINT_TTL_SECONDS, keep_last=settings.CHECKPOINT_KEEP_LAST)
+    if settings.CHECKPOINTER == "none":
+        return None
+    raise ValueError(f"Unknown checkpointer {settings.CHECKPOINTER!r}, expected 'redis' or 'none'")
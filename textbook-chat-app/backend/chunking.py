@@ -0,0 +1,95 @@
+import re
+from typing import Iterable, Iterator
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+CHUNK_STRATEGIES = ("page", "recursive", "structure")
+
+# Section headings as they appear in extracted OpenStax text, e.g. "4.3 Newton's Second Law of Motion"
+_HEADING_RE = re.compile(r"^(\d+)\.(\d+) +([A-Z][^\n]{3,})$", re.MULTILINE)
+
+
+def _splitter(chunk_size, chunk_overlap):
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
+
+def _split_on_headings(text, chapter):
+    """
+    Splits page text at section headings of the page's chapter.
+
+    Returns:
+        list[tuple[dict | None, str]]: Section metadata started by each piece (None for text before the
+        first heading), and the piece's text
+    """
+    pieces = []
+    start = 0
+    current = None
+    for match in _HEADING_RE.finditer(text):
+        if f"Chapter {match.group(1)}" != chapter:
+            continue
+        if text[start:match.start()].strip():
+            pieces.append((current, text[start:match.start()]))
+        current = {"section": f"{match.group(1)}.{match.group(2)}", "section_title": match.group(0).strip()}
+        start = match.start()
+    pieces.append((current, text[start:]))
+    return pieces
+
+
+def chunk_documents(documents: Iterable[Document], strategy: str, chunk_size: int,
+                    chunk_overlap: int) -> Iterator[Document]:
+    """
+    Splits page documents into smaller chunks for retrieval, keeping chapter/section/page provenance.
+
+    Args:
+        documents (Iterable[Document]): Pages in book order, e.g. from extraction.extract_documents
+        strategy (str): One of CHUNK_STRATEGIES:
+            "page" keeps one document per page,
+            "recursive" splits on paragraphs, then lines and sentences, to fit chunk_size,
+            "structure" first splits at section headings, so no chunk spans two sections, then
+            splits each piece like "recursive". Pages without a heading take the outline's section,
+            or else carry over the last heading's section within the same chapter.
+        chunk_size (int): Maximum chunk length in characters
+        chunk_overlap (int): Characters shared between neighbouring chunks
+
+    Yields:
+        Document: Chunks whose metadata is the page's metadata plus a "chunk" index within the page
+    """
+    if strategy not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}, expected one of {CHUNK_STRATEGIES}")
+
+    if strategy == "page":
+        yield from documents
+        return
+
+    splitter = _splitter(chunk_size, chunk_overlap)
+    current_chapter = None
+    current_section = None
+    for document in documents:
+        if strategy == "recursive":
+            pieces = [(None, document.page_content)]
+        else:
+            pieces = _split_on_headings(document.page_content, document.metadata.get("chapter"))
+
+        # A section never carries over into another chapter
+        if document.metadata.get("chapter") != current_chapter:
+            current_chapter = document.metadata.get("chapter")
+            current_section = None
+        # Without a heading on the page, the outline's section for it is more reliable than carrying one over
+        if all(section is None for section, _ in pieces) and "section" in document.metadata:
+            current_section = {key: document.metadata[key] for key in ("section", "section_title") if key in document.metadata}
+
+        chunk_index = 0
+        for section, text in pieces:
+            if section is not None:
+                current_section = section
+            metadata = dict(document.metadata)
+            if strategy == "structure" and current_section is not None:
+                metadata.update(current_section)
+            for chunk in splitter.split_text(text):
+                yield Document(page_content=chunk, metadata={**metadata, "chunk": chunk_index})
+                chunk_index += 1
@@ -0,0 +1,95 @@
+import math
+import re
+from typing import Any, Optional, Sequence
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+
+COMPRESSOR_MODES = ("llm", "batched", "embedding", "lexical", "none")
+
+_TOKEN_RE = re.compile(r"\d+(?:\.\d+)*|[a-z]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its of on or that the this to "
+    "was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str):
+    """
+    Lowercases text and splits it into words and numbers, keeping section numbers like "4.3" whole.
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class LexicalFilter(BaseDocumentCompressor):
+    """
+    Keeps documents that share enough query terms, scored locally without any model call.
+
+    The score is the idf-weighted fraction of the query's terms found in the document, with idf
+    estimated over the candidate set.
+    """
+
+    min_score: float = 0.2
+    top_n: Optional[int] = None
+
+    def _score(self, query_terms, documents):
+        doc_terms = [set(tokenize(d.page_content)) for d in documents]
+        n = len(documents)
+        weights = {t: math.log(1 + n / (1 + sum(t in terms for terms in doc_terms))) + 1e-6 for t in query_terms}
+        total = sum(weights.values())
+        return [sum(w for t, w in weights.items() if t in terms) / total for terms in doc_terms]
+
+    def compress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        query_terms = set(tokenize(query))
+        if not documents or not query_terms:
+            return list(documents)
+        scored = sorted(zip(self._score(query_terms, documents), documents), key=lambda x: x[0], reverse=True)
+        kept = [doc for score, doc in scored if score >= self.min_score]
+        return kept[: self.top_n] if self.top_n else kept
+
+
+BATCHED_FILTER_PROMPT = """Given a question and numbered passages from a textbook, list the numbers of the
+passages that contain information useful for answering the question.
+Reply with a comma-separated list of numbers only, or NONE if no passage is relevant.
+
+Question: {question}
+
+{passages}
+
+Relevant passages:"""
+
+
+class BatchedLLMFilter(BaseDocumentCompressor):
+    """
+    Asks the LLM which candidates are relevant in a single call, instead of one call per document.
+    """
+
+    llm: Any
+
+    def _prompt(self, documents, query):
+        passages = "\n\n".join(f"[{i}] {d.page_content}" for i, d in enumerate(documents, start=1))
+        return BATCHED_FILTER_PROMPT.format(question=query, passages=passages)
+
+    @staticmethod
+    def _parse(output, documents):
+        text = getattr(output, "content", output)
+        indexes = {int(i) for i in re.findall(r"\d+", text)}
+        return [d for i, d in enumerate(documents, start=1) if i in indexes]
+
+    def compress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        output = self.llm.invoke(self._prompt(documents, query), config={"callbacks": callbacks})
+        return self._parse(output, documents)
+
+    async def acompress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        output = await self.llm.ainvoke(self._prompt(documents, query), config={"callbacks": callbacks})
+        return self._parse(output, documents)
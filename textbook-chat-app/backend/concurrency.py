@@ -0,0 +1,183 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Optional
+
+
+class ChatOverloaded(Exception):
+    """
+    Raised when too many chat turns are already waiting for a free slot.
+    """
+
+
+@dataclass
+class ChatTurn:
+    key: Hashable
+    session_id: Optional[str]
+    result: asyncio.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+    holds_session: bool = False
+    holds_slot: bool = False
+
+
+class ChatCoordinator:
+    """
+    Orders, de-duplicates and rate-limits chat turns in this worker.
+
+    - Identical requests (same session, textbook and message) that arrive while the first one is still
+      running don't run the agent again; they wait for and share its reply.
+    - Different requests for the same session run one at a time in arrival order, so each turn reads
+      the history the previous one saved. Anonymous turns are stateless and skip this.
+    - At most `max_concurrency` turns run the agent at once across all sessions, protecting the LLM
+      quota. Up to `max_queue` more wait for a slot; beyond that ChatOverloaded is raised.
+
+    Usage:
+        pending = coordinator.pending(key)
+        if pending: reply = await coordinator.join(pending)
+        turn = await coordinator.begin(session_id, key)
+        try: ... coordinator.finish(turn, reply)
+        except Exception as e: coordinator.finish(turn, error=e)
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[Hashable, ChatTurn] = {}
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._session_users: Dict[str, int] = {}
+        self.running = 0
+        self.queued = 0
+        self.queued_peak = 0
+        self.session_waiting = 0
+        self.turns = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def pending(self, key: Hashable) -> Optional[asyncio.Future]:
+        """
+        Returns the result future of an identical turn that is still running, if there is one.
+        """
+        turn = self._inflight.get(key)
+        return turn.result if turn else None
+
+    async def join(self, result: asyncio.Future):
+        """
+        Waits for another turn's reply. Cancelling the waiter doesn't cancel the original turn.
+        """
+        self.coalesced += 1
+        return await asyncio.shield(result)
+
+    async def begin(self, session_id: Optional[str], key: Hashable) -> ChatTurn:
+        """
+        Registers a turn and waits until it may run. Callers must pass the turn to finish().
+
+        Raises:
+            ChatOverloaded: If max_queue turns are already waiting for a slot
+        """
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ChatOverloaded(f"{self.queued} chat requests are already queued")
+
+        turn = ChatTurn(key=key, session_id=session_id, result=asyncio.get_running_loop().create_future())
+        self._inflight[key] = turn
+        if session_id is not None:
+            self._session_users[session_id] = self._session_users.get(session_id, 0) + 1
+        try:
+            if session_id is not None:
+                lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+                self.session_waiting += 1
+                try:
+                    await lock.acquire()
+                finally:
+                    self.session_waiting -= 1
+                turn.holds_session = True
+
+            self.queued += 1
+            self.queued_peak = max(self.queued_peak, self.queued)
+            try:
+                await self._slots.acquire()
+            finally:
+                self.queued -= 1
+            turn.holds_slot = True
+        except BaseException as e:
+            self.finish(turn, error=e)
+            raise
+
+        waited = time.perf_counter() - turn.queued_at
+        self.turns += 1
+        self.running += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        return turn
+
+    @asynccontextmanager
+    async def session(self, session_id: str):
+        """
+        Holds a session's lock without taking an agent slot, for work that must not interleave with
+        the session's turns, e.g. saving a cached reply to its history.
+        """
+        self._session_users[session_id] = self._session_users.get(session_id, 0) + 1
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        try:
+            async with lock:
+                yield
+        finally:
+            self._session_users[session_id] -= 1
+            if self._session_users[session_id] == 0:
+                del self._session_users[session_id]
+                del self._session_locks[session_id]
+
+    def finish(self, turn: ChatTurn, reply=None, error: Optional[BaseException] = None) -> None:
+        """
+        Publishes the turn's reply (or error) to joined duplicates and lets the next turn run.
+        Calling it again for the same turn does nothing.
+        """
+        if self._inflight.get(turn.key) is turn:
+            del self._inflight[turn.key]
+        if not turn.result.done():
+            if error is None:
+                turn.result.set_result(reply)
+            else:
+                if isinstance(error, asyncio.CancelledError):
+                    # Joined duplicates shouldn't be cancelled because the original client went away
+                    error = RuntimeError("The original request was cancelled")
+                turn.result.set_exception(error)
+                # Nobody may have joined; mark the error as seen so asyncio doesn't log it
+                turn.result.exception()
+
+        if turn.holds_slot:
+            turn.holds_slot = False
+            self.running -= 1
+            self._slots.release()
+
+        session_id = turn.session_id
+        if session_id is not None:
+            turn.session_id = None
+            if turn.holds_session:
+                turn.holds_session = False
+                self._session_locks[session_id].release()
+            self._session_users[session_id] -= 1
+            if self._session_users[session_id] == 0:
+                del self._session_users[session_id]
+                del self._session_locks[session_id]
+
+    def stats(self) -> dict:
+        """
+        Returns running/queued turn counts, coalesced and rejected requests, and slot wait times.
+        """
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "queued": self.queued,
+            "queued_peak": self.queued_peak,
+            "session_waiting": self.session_waiting,
+            "turns": self.turns,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "wait_ms_avg": self.wait_time_total / self.turns * 1000 if self.turns else 0.0,
+            "wait_ms_max": self.wait_time_max * 1000,
+        }
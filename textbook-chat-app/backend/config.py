@@ -1,12 +1,88 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key"  # Change in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    USER_CACHE_TTL_SECONDS: float = 30.0  # How long a worker trusts its cached copy of a user
+    USER_CACHE_MAX_ENTRIES: int = 10_000
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt cost; raising it rehashes passwords on next login
+    PASSWORD_HASH_WORKERS: int = 4  # Threads hashing passwords at once
     
     # Database settings
     DATABASE_URL: str = "sqlite:///./test.db"  # Default to SQLite
+
+    # Redis settings
+    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50  # Per process, across both pools
+    REDIS_BINARY_CONNECTIONS: int = 15  # Share of REDIS_MAX_CONNECTIONS for undecoded data (history, checkpoints)
+    REDIS_POOL_TIMEOUT: float = 5.0  # Seconds to wait for a free pooled connection
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+
+    # Ingestion settings
+    EMBEDDING_BATCH_SIZE: int = 64  # Documents per embedding request
+    EMBEDDING_MAX_WORKERS: int = 4  # Embedding batches in flight at once
+    EMBEDDING_CACHE_PATH: str = "./data/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    EXTRACTION_WORKERS: int = 1  # Processes used for PDF text extraction, 1 = serial
+    CHUNK_STRATEGY: str = "structure"  # page, recursive or structure
+    CHUNK_SIZE: int = 1200  # Characters per chunk
+    CHUNK_OVERLAP: int = 150  # Characters shared between neighbouring chunks
+    INGEST_CONCURRENCY: int = 1  # Textbooks ingested at the same time
+    RUN_INGESTION: bool = True  # Run queued ingestion jobs in this process; False for extra API workers
+
+    # Textbook settings
+    CHROMA_PATH: str = "./chroma"
+    CHROMA_MEMORY_LIMIT_MB: int = 2048  # Vector segments kept in memory across all textbooks
+    CHROMA_HOST: Optional[str] = None  # Use a shared Chroma server instead of CHROMA_PATH
+    CHROMA_PORT: int = 8001
+    MAX_LOADED_TEXTBOOKS: int = 4  # Retrievers and graphs kept loaded, least recently used are dropped
+    DEFAULT_TEXTBOOK_ID: str = "physics"
+    TEXTBOOK_CATALOG_PATH: str = "data/books.json"
+    TEXTBOOK_PUBLIC_DIR: str = "public"
+    WARMUP_TEXTBOOKS: List[str] = ["physics"]  # Loaded at startup instead of on first chat
+    WARMUP_IN_BACKGROUND: bool = True  # Accept requests while warming up; /readyz reports progress
+
+    # Retrieval settings
+    RETRIEVER_K: int = 4  # Candidates fetched from the vector store per query
+    RETRIEVER_COMPRESSOR: str = "embedding"  # llm, batched, embedding, lexical or none
+    RETRIEVER_SCORE_THRESHOLD: float = 0.1  # Min Chroma relevance score kept by the embedding compressor
+    RETRIEVER_LEXICAL_MIN_SCORE: float = 0.2  # Min query term coverage kept by the lexical compressor
+    RETRIEVER_HYBRID: bool = True  # Fuse BM25 lexical results with vector results
+    RETRIEVER_RRF_K: int = 60  # Reciprocal rank fusion constant
+    LEXICAL_INDEX_DIR: str = "./chroma/lexical"
+    SECTION_INDEX_DIR: str = "./chroma/sections"
+    RETRIEVAL_CACHE_ENABLED: bool = True  # Reuse results for repeated queries with the same scope
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = 2000  # In-process entries per worker
+    RETRIEVAL_CACHE_TTL_SECONDS: int = 60 * 60
+
+    # Chat settings
+    CHAT_THREAD_POOL_SIZE: int = 16  # Threads for sync work offloaded from the event loop
+    CHAT_HISTORY_TURNS: int = 10  # Recent turns sent verbatim; older turns are summarized
+    CHAT_SUMMARY_BATCH_TURNS: int = 5  # Turns past the window folded into the summary per summary call
+    CHAT_TOKEN_BUDGET: int = 6000  # Max history tokens sent to the agent per request
+    HISTORY_TTL_SECONDS: int = 365 * 24 * 60 * 60  # Histories expire a year after the last message, 0 = never
+    HISTORY_MAX_MESSAGES: int = 2000  # Oldest messages beyond this are dropped, 0 = unlimited
+    HISTORY_COMPRESS_MIN_BYTES: int = 512  # zlib-compress stored messages at least this large, 0 = never
+    SUMMARY_MODEL: str = "gpt-4o-mini"
+    CHAT_MAX_CONCURRENCY: int = 32  # Agent runs at once per worker, to stay within the LLM rate limit
+    CHAT_MAX_QUEUE: int = 200  # Turns allowed to wait for a slot before requests get a 503
+    GRAPH_AGENT: str = "prebuilt"  # prebuilt (LangGraph ReAct agent) or parallel (concurrent tool calls)
+    TOOL_TIMEOUT_SECONDS: float = 30.0  # Per tool call, parallel agent only
+    TOOL_TIMEOUTS: Dict[str, float] = {}  # Per-tool overrides by tool name, e.g. TOOL_TIMEOUTS='{"retrieve_textbook_content": 10}'
+    TOOL_MAX_WORKERS: int = 8  # Threads running sync tool calls, shared by every textbook's graph
+    CHECKPOINTER: str = "none"  # none (chat history alone carries the conversation) or redis (shared by all workers)
+    CHECKPOINT_TTL_SECONDS: int = 7 * 24 * 60 * 60  # Agent state expires after a week without activity
+    CHECKPOINT_KEEP_LAST: int = 10  # Checkpoints kept per conversation
+
+    # Semantic answer cache settings
+    SEMANTIC_CACHE_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Min cosine similarity to reuse an answer
+    SEMANTIC_CACHE_MIN_QUESTION_CHARS: int = 20  # Shorter messages depend on context and aren't cached
+    SEMANTIC_CACHE_TTL_SECONDS: float = 24 * 60 * 60
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000  # Per textbook
     
     class Config:
         env_file = ".env"
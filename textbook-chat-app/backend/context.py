@@ -0,0 +1,88 @@
+from typing import List, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, get_buffer_string, trim_messages
+
+from backend.config import settings
+from backend.history import AsyncRedisChatMessageHistory
+from backend.redis_client import redis_client
+
+SUMMARY_PROMPT = """You maintain a running summary of a tutoring conversation between a student and an AI tutor.
+Extend the existing summary with the new messages below. Keep the topics covered, what the student
+understood or struggled with, and any quiz questions and results. Reply with the updated summary only.
+
+Existing summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
+class ContextManager:
+    """
+    Builds the agent's input for a chat turn from a bounded slice of the session's history.
+
+    The last `max_turns` turns are sent verbatim and older turns are folded into a rolling summary
+    that is cached per session. Turns that leave the window are kept verbatim until `batch_turns`
+    of them have piled up, then folded in one summary call, so long sessions pay for a summary every
+    `batch_turns` turns instead of on every turn. The window is then trimmed to fit `token_budget`.
+    """
+
+    def __init__(self, llm, summary_llm, max_turns: int, token_budget: int, batch_turns: int = 1) -> None:
+        self.llm = llm
+        self.summary_llm = summary_llm
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.batch_turns = max(batch_turns, 1)
+
+    async def _summary(self, session_id: str, history: AsyncRedisChatMessageHistory, total: int,
+                       window: int) -> Tuple[str, int]:
+        """
+        Returns the session's summary and how many messages past the window it doesn't cover yet.
+        """
+        key = f"summary:{session_id}"
+        cached = await redis_client.hgetall(key)
+        summary = cached.get("text", "")
+        covered = int(cached.get("covered", 0))
+
+        # Counted from the session's first message, including any that retention has since dropped
+        trimmed = await history.atrimmed()
+        older = trimmed + total - window
+        pending = older - max(covered, trimmed)
+        if pending < self.batch_turns * 2:
+            return summary, max(pending, 0)
+
+        # Fold only the messages that left the window since the summary was last updated
+        folded = await history.aget_range(window, pending)
+        response = await self.summary_llm.ainvoke(
+            SUMMARY_PROMPT.format(summary=summary or "(none)", messages=get_buffer_string(folded))
+        )
+        summary = response.content
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.hset(key, mapping={"text": summary, "covered": older})
+        if settings.HISTORY_TTL_SECONDS:
+            # Expire with the history it summarizes
+            pipe.expire(key, settings.HISTORY_TTL_SECONDS)
+        await pipe.execute()
+        return summary, 0
+
+    async def build_messages(self, session_id: str, history: AsyncRedisChatMessageHistory,
+                             message: HumanMessage) -> List[BaseMessage]:
+        """
+        Returns the summary, the recent window and the new message, within the token budget.
+        """
+        window_size = self.max_turns * 2  # a turn is one user and one assistant message
+        total = await history.alen()
+        summary, pending = await self._summary(session_id, history, total, min(window_size, total))
+        # Messages not summarized yet stay in the window until they are
+        window = await history.aget_range(0, window_size + pending)
+
+        prefix = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] if summary else []
+        reserved = self.llm.get_num_tokens_from_messages(prefix + [message])
+        window = trim_messages(
+            window,
+            max_tokens=max(self.token_budget - reserved, 0),
+            token_counter=self.llm,
+            strategy="last",
+            start_on="human",
+        )
+        return prefix + window + [message]
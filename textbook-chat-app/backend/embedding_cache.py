@@ -0,0 +1,151 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text):
+    """
+    Normalizes page text so that whitespace and unicode form differences don't change the cache key.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def _pack(vector):
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob):
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent on-disk cache in front of an embedding function.
+
+    Document embeddings are keyed by (model, sha256 of the normalized text), so unchanged pages are
+    never re-embedded, even after the Chroma collection is wiped or renamed. The cache is bounded to
+    max_entries and evicts the least recently used vectors first. Any Embeddings implementation can be
+    wrapped, e.g. langchain_core's DeterministicFakeEmbedding for local runs.
+    """
+
+    def __init__(self, embeddings, path, max_entries, model=None) -> None:
+        self.embeddings = embeddings
+        self.model = model or getattr(embeddings, "model", type(embeddings).__name__)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def _key(self, text):
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model}:{digest}"
+
+    def _lookup(self, keys):
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update((key, _unpack(blob)) for key, blob in rows)
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+            )
+        return found
+
+    def _store(self, items):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(key, self.model, _pack(vector), now) for key, vector in items],
+        )
+        self._evict()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def embed_documents(self, texts):
+        """
+        Returns cached vectors where available and embeds only the texts that missed.
+        """
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            cached = self._lookup(keys)
+            self._conn.commit()
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        misses = sum(1 for key in keys if key not in cached)
+        with self._lock:
+            self.hits += len(keys) - misses
+            self.misses += misses
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            with self._lock:
+                self._store(computed.items())
+                self._conn.commit()
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text):
+        # Queries are one-off and cheap to embed, so they bypass the cache
+        return self.embeddings.embed_query(text)
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the current number of cached vectors.
+        """
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": size,
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,139 @@
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+from PyPDF2 import PdfReader
+from tqdm import tqdm
+
+
+def chapter_page_ranges(bookmarks, page_count):
+    """
+    Returns the zero-based [start, end) page range of every chapter in the bookmarks.
+
+    Args:
+        bookmarks (dict): Bookmarks from bookmark.build_bookmarks
+        page_count (int): Number of pages in the PDF
+
+    Returns:
+        list[tuple[int, int, int]]: (chapter number, start page, end page) for each chapter
+    """
+    page_ranges = []
+    chapter_num = bookmarks["chapter_num"]
+    for i in range(1, chapter_num + 1):
+        chapter = bookmarks[f"chapter {i}"]
+        start_page = chapter["page_num"] - 1
+        end_page = chapter.get("last_page")
+        if end_page is None:
+            # Fall back to the start of the next chapter, or the end of the book
+            if i < chapter_num:
+                end_page = bookmarks[f"chapter {i+1}"]["page_num"] - 1
+            else:
+                end_page = page_count
+        page_ranges.append((i, start_page, min(end_page, page_count)))
+    return page_ranges
+
+
+def section_lookup(bookmarks):
+    """
+    Maps each 1-based PDF page covered by a section's page_range to that section's metadata.
+
+    Args:
+        bookmarks (dict): Bookmarks from bookmark.build_bookmarks
+
+    Returns:
+        dict[int, dict]: Section id (e.g. "4.3") and title for each page
+    """
+    sections = {}
+    for i in range(1, bookmarks["chapter_num"] + 1):
+        for section in bookmarks[f"chapter {i}"]["sections"]:
+            match = re.match(r"^(\d+\.\d+)", section["title"])
+            metadata = {"section": match.group(1) if match else section["title"], "section_title": section["title"]}
+            start_page, end_page = section["page_range"]
+            for pdf_page in range(start_page, end_page + 1):
+                sections[pdf_page] = metadata
+    return sections
+
+
+def _page_document(text, bookmarks, sections, chapter, page_num, pdf_page):
+    metadata = {
+        "chapter": f"Chapter {chapter}",
+        "chapter_title": bookmarks[f"chapter {chapter}"]["title"],
+        "page": page_num,
+        "pdf_page": pdf_page,
+    }
+    metadata.update(sections.get(pdf_page, {}))
+    return Document(page_content=text, metadata=metadata)
+
+
+def iter_chapter_documents(reader, bookmarks):
+    """
+    Walks the PDF pages once and yields one Document per page of every chapter, straight from memory.
+
+    Args:
+        reader (PdfReader): Open PDF reader
+        bookmarks (dict): Bookmarks from bookmark.build_bookmarks
+
+    Yields:
+        Document: Page text with chapter, section, page-in-chapter and PDF page metadata
+    """
+    sections = section_lookup(bookmarks)
+    page_ranges = chapter_page_ranges(bookmarks, len(reader.pages))
+    for chapter, start_page, end_page in tqdm(page_ranges, desc="Loading documents"):
+        for page_num, pdf_page in enumerate(range(start_page, end_page), start=1):
+            text = reader.pages[pdf_page].extract_text()
+            yield _page_document(text, bookmarks, sections, chapter, page_num, pdf_page + 1)
+
+
+# The PDF opened by each extraction worker process, set by _init_worker
+_worker_reader = None
+
+
+def _init_worker(textbook_path):
+    global _worker_reader
+    _worker_reader = PdfReader(textbook_path)
+
+
+def _extract_chapter(chapter, start_page, end_page):
+    # Runs in a worker process on the PDF it opened once at startup, and returns plain strings,
+    # which are much cheaper to pickle than Documents.
+    return chapter, start_page, [_worker_reader.pages[i].extract_text() for i in range(start_page, end_page)]
+
+
+def extract_documents(textbook_path, bookmarks, workers=1):
+    """
+    Extracts one Document per chapter page, optionally splitting the chapters across worker processes.
+
+    With workers > 1 each process extracts whole chapters and the results are merged back in page
+    order, so the output is identical to iter_chapter_documents.
+
+    Args:
+        textbook_path (str): Path to the PDF file
+        bookmarks (dict): Bookmarks from bookmark.build_bookmarks
+        workers (int): Number of extraction processes; 1 extracts serially in this process
+
+    Yields:
+        Document: Page text with chapter, section, page-in-chapter and PDF page metadata
+    """
+    reader = PdfReader(textbook_path)
+    if workers <= 1:
+        yield from iter_chapter_documents(reader, bookmarks)
+        return
+
+    sections = section_lookup(bookmarks)
+    page_ranges = chapter_page_ranges(bookmarks, len(reader.pages))
+    # Ingestion runs on threads of a process holding Redis and Chroma connections, which a forked
+    # worker would inherit mid-use, so workers are spawned fresh and each parses the PDF once
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(textbook_path,),
+    )
+    with pool:
+        futures = [pool.submit(_extract_chapter, *page_range) for page_range in page_ranges]
+        # Consume results in submission order so pages come back in book order
+        for future in tqdm(futures, desc="Loading documents"):
+            chapter, start_page, texts = future.result()
+            for page_num, text in enumerate(texts, start=1):
+                yield _page_document(text, bookmarks, sections, chapter, page_num, start_page + page_num)
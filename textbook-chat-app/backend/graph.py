@@ -1,7 +1,10 @@
 from langgraph.graph import StateGraph, START, END
+from backend.config import settings
 from backend.tools import BasicToolNode, get_tools
 from backend.state import State
 from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from concurrent.futures import ThreadPoolExecutor
 from typing import Annotated
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
@@ -63,15 +66,70 @@ systemPrompt = SystemMessage(
 
 
 
-def build_graph(llm, retriever):
+_DEFAULT_CHECKPOINTER = object()
+
+# One pool per process for sync tool calls, shared by every parallel graph, so graphs built for
+# textbooks that were later evicted don't leave idle threads behind
+_tool_executor = ThreadPoolExecutor(max_workers=settings.TOOL_MAX_WORKERS, thread_name_prefix="tool")
+
+GRAPH_AGENTS = ("prebuilt", "parallel")
+
+
+def build_graph(llm, tools, checkpointer=_DEFAULT_CHECKPOINTER, agent=None):
     """
     Builds and compiles the chatbot's state graph.
+
+    The compiled graph is meant to be built once at startup and shared by every request.
+
+    Args:
+        llm (BaseChatModel): Chat model driving the agent
+        tools (list): Tools from get_tools
+        checkpointer (BaseCheckpointSaver): Saver for per-thread state. Defaults to a new
+            MemorySaver; pass None for a stateless graph.
+        agent (str): "prebuilt" for LangGraph's ReAct agent, or "parallel" for our own graph whose
+            BasicToolNode runs the model's tool calls concurrently. Defaults to settings.GRAPH_AGENT.
+
+    Returns:
+        CompiledGraph
     """
-    tools = get_tools(retriever)
-    memory = MemorySaver()
-    
-    graph = create_react_agent(llm, tools,  checkpointer=memory, state_modifier=systemPrompt)
-    return graph
+    if checkpointer is _DEFAULT_CHECKPOINTER:
+        checkpointer = MemorySaver()
+    agent = agent or settings.GRAPH_AGENT
+
+    if agent == "prebuilt":
+        return create_react_agent(llm, tools,  checkpointer=checkpointer, state_modifier=systemPrompt)
+    if agent == "parallel":
+        return _build_parallel_graph(llm, tools, checkpointer)
+    raise ValueError(f"Unknown agent {agent!r}, expected one of {GRAPH_AGENTS}")
+
+
+def _build_parallel_graph(llm, tools, checkpointer):
+    """
+    Same agent loop as the prebuilt ReAct agent (model -> tools -> model until no tool calls), with
+    the same "agent" and "tools" node names, but tools run through BasicToolNode.
+    """
+    llm_with_tools = llm.bind_tools(tools)
+
+    def call_model(state: State, config: RunnableConfig):
+        return {"messages": [llm_with_tools.invoke([systemPrompt] + state["messages"], config)]}
+
+    async def acall_model(state: State, config: RunnableConfig):
+        return {"messages": [await llm_with_tools.ainvoke([systemPrompt] + state["messages"], config)]}
+
+    tool_node = BasicToolNode(
+        tools,
+        timeout=settings.TOOL_TIMEOUT_SECONDS,
+        timeouts=settings.TOOL_TIMEOUTS,
+        executor=_tool_executor,
+    )
+
+    graph_builder = StateGraph(State)
+    graph_builder.add_node("agent", RunnableLambda(call_model, afunc=acall_model, name="agent"))
+    graph_builder.add_node("tools", RunnableLambda(tool_node, afunc=tool_node.ainvoke, name="tools"))
+    graph_builder.add_edge(START, "agent")
+    graph_builder.add_conditional_edges("agent", route_tools, {"tools": "tools", END: END})
+    graph_builder.add_edge("tools", "agent")
+    return graph_builder.compile(checkpointer=checkpointer)
 
 
 def route_tools(state: State):
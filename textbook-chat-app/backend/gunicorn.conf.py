@@ -0,0 +1,46 @@
+# gunicorn.conf.py
+#
+# Multi-worker launcher for the API. Run from textbook-chat-app:
+#     gunicorn -c backend/gunicorn.conf.py backend.main:app
+#
+# Every worker is a separate process, so state that must be shared lives outside them:
+#   - chat history in Redis, which alone decides what the agent sees each turn, so any worker can
+#     serve any turn. No checkpointer is needed (CHECKPOINTER=none, the default).
+#   - vectors in a Chroma server (CHROMA_HOST), read by the workers
+#   - ingestion in one separate process, so only it writes to the index:
+#         RUN_INGESTION=true CHROMA_HOST=... python -m backend.jobs
+#   - the lexical and section indexes as files under LEXICAL_INDEX_DIR and SECTION_INDEX_DIR, written
+#     by the ingestion process and read by the workers. Across pods, put them on a shared volume.
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# The API is I/O bound (LLM and Redis calls), so one async worker per core is enough
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Streaming answers can take a while; keep workers alive well past a slow LLM response
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Workers import the app themselves after forking, so no Chroma or Redis connection is shared
+# across processes. Imports are lazy, so this keeps worker start cheap.
+preload_app = False
+
+# Recycle workers now and then to bound memory growth from loaded textbooks
+max_requests = 2000
+max_requests_jitter = 200
+
+raw_env = [
+    "RUN_INGESTION=false",
+]
+
+
+def on_starting(server):
+    if not os.environ.get("CHROMA_HOST"):
+        server.log.warning(
+            "CHROMA_HOST is not set: each worker opens the local Chroma index on its own and won't see "
+            "books indexed by another process until it restarts"
+        )
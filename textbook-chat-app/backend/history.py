@@ -0,0 +1,173 @@
+import json
+import time
+import zlib
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+import ormsgpack
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from backend.config import settings
+from backend.redis_client import binary_redis_client
+
+# First byte of a stored message. Entries written by langchain's RedisChatMessageHistory (and by
+# earlier versions of this class) are JSON objects and start with "{".
+_PACKED = b"\x01"
+_PACKED_ZLIB = b"\x02"
+
+_ROLES = ("human", "ai", "system")
+_MESSAGE_TYPES = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+
+class HistoryRecord(NamedTuple):
+    role: str  # "human", "ai" or "system"
+    content: Any
+    timestamp: float  # Seconds since the epoch, 0 for legacy JSON entries
+
+
+def encode_record(role: str, content: Any, timestamp: float, compress_min_bytes: int = 0) -> bytes:
+    """
+    Packs a message as a role code, content and millisecond timestamp with msgpack, compressing
+    it with zlib when the packed form is at least `compress_min_bytes` long (0 disables).
+    """
+    packed = ormsgpack.packb((_ROLES.index(role), content, int(timestamp * 1000)))
+    if compress_min_bytes and len(packed) >= compress_min_bytes:
+        compressed = zlib.compress(packed)
+        if len(compressed) < len(packed):
+            return _PACKED_ZLIB + compressed
+    return _PACKED + packed
+
+
+def decode_record(item: bytes) -> HistoryRecord:
+    marker, body = item[:1], item[1:]
+    if marker == _PACKED_ZLIB:
+        body = zlib.decompress(body)
+    elif marker != _PACKED:
+        # Legacy JSON entry: {"type": "human", "data": {"content": ...}}
+        legacy = json.loads(item)
+        return HistoryRecord(legacy["type"], legacy["data"]["content"], 0.0)
+    role, content, timestamp_ms = ormsgpack.unpackb(body)
+    return HistoryRecord(_ROLES[role], content, timestamp_ms / 1000)
+
+
+def to_message(record: HistoryRecord) -> BaseMessage:
+    return _MESSAGE_TYPES.get(record.role, HumanMessage)(content=record.content)
+
+
+class AsyncRedisChatMessageHistory:
+    """
+    Chat message history stored in Redis, using the shared redis.asyncio client.
+
+    Messages are pushed to the head of a Redis list (the key layout of langchain's
+    RedisChatMessageHistory) as compact msgpack records of role, content and timestamp, optionally
+    zlib-compressed. Older JSON entries in the same list are still read.
+
+    Retention: the list expires `ttl` seconds after the last message and keeps at most `max_messages`
+    (0 disables either). Dropped messages are counted so the context summary can account for them.
+    """
+
+    def __init__(self, session_id: str, key_prefix: str = "message_store:",
+                 ttl: Optional[int] = None, max_messages: Optional[int] = None) -> None:
+        self.session_id = session_id
+        self.key = key_prefix + session_id
+        self.trimmed_key = f"message_store_trimmed:{session_id}"
+        self.ttl = settings.HISTORY_TTL_SECONDS if ttl is None else ttl
+        self.max_messages = settings.HISTORY_MAX_MESSAGES if max_messages is None else max_messages
+
+    async def aget_messages(self) -> List[BaseMessage]:
+        """
+        Returns the session's messages, oldest first.
+        """
+        return await self.aget_range(0, -1)
+
+    async def aget_range(self, skip: int, count: int) -> List[BaseMessage]:
+        """
+        Returns `count` messages, oldest first, after skipping the `skip` newest ones.
+        A count of -1 returns every remaining message.
+        """
+        return [to_message(record) for record in await self.aget_records(skip, count)]
+
+    async def aget_records(self, skip: int, count: int) -> List[HistoryRecord]:
+        """
+        Like aget_range, but returns plain records without building LangChain messages.
+        """
+        stop = -1 if count == -1 else skip + count - 1
+        if stop != -1 and stop < skip:
+            return []
+        items = await binary_redis_client.lrange(self.key, skip, stop)
+        # Messages are pushed to the head of the list, so the newest comes first
+        return [decode_record(item) for item in reversed(items)]
+
+    async def apage(self, before: Optional[int], limit: int) -> Tuple[int, List[HistoryRecord]]:
+        """
+        Returns up to `limit` records preceding the `before` position (the newest ones if None),
+        oldest first, along with the position of the first one.
+
+        Positions count every message the session ever stored, oldest first, so they stay the same
+        as new messages arrive and retention trims old ones. Pass the returned position as `before`
+        to fetch the previous page.
+        """
+        while True:
+            trimmed = await self.atrimmed()
+            if before is None:
+                start, stop = 0, limit - 1
+            else:
+                # Messages are pushed to the head of the list, so counting from the tail keeps the
+                # index of a position stable while new ones arrive
+                end = before - trimmed
+                if end <= 0:
+                    return before, []
+                start, stop = -end, -(max(end - limit, 0) + 1)
+
+            pipe = binary_redis_client.pipeline(transaction=True)
+            pipe.get(self.trimmed_key)
+            pipe.llen(self.key)
+            pipe.lrange(self.key, start, stop)
+            current, length, items = await pipe.execute()
+            # Retention dropped messages in between, which shifts the tail: read again
+            if int(current or 0) != trimmed:
+                continue
+
+            records = [decode_record(item) for item in reversed(items)]
+            if before is None:
+                first = trimmed + length - len(records)
+            else:
+                first = trimmed + max(end - limit, 0)
+            return first, records
+
+    async def alen(self) -> int:
+        return await binary_redis_client.llen(self.key)
+
+    async def atrimmed(self) -> int:
+        """
+        Returns how many of the session's oldest messages retention has dropped so far.
+        """
+        return int(await binary_redis_client.get(self.trimmed_key) or 0)
+
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """
+        Appends messages to the session in a single round-trip, then applies the retention policy.
+        """
+        if not messages:
+            return
+        now = time.time()
+        items = [
+            encode_record(m.type, m.content, now, settings.HISTORY_COMPRESS_MIN_BYTES)
+            for m in messages
+        ]
+        pipe = binary_redis_client.pipeline(transaction=True)
+        pipe.lpush(self.key, *items)
+        if self.max_messages:
+            pipe.ltrim(self.key, 0, self.max_messages - 1)
+        if self.ttl:
+            pipe.expire(self.key, self.ttl)
+            pipe.expire(self.trimmed_key, self.ttl)
+        length = (await pipe.execute())[0]
+
+        if self.max_messages and length > self.max_messages:
+            pipe = binary_redis_client.pipeline(transaction=True)
+            pipe.incrby(self.trimmed_key, length - self.max_messages)
+            if self.ttl:
+                pipe.expire(self.trimmed_key, self.ttl)
+            await pipe.execute()
+
+    async def aclear(self) -> None:
+        await binary_redis_client.delete(self.key, self.trimmed_key)
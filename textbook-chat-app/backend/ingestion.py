@@ -0,0 +1,86 @@
+import hashlib
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from tqdm import tqdm
+
+from backend.config import settings
+
+
+def _batched(documents, batch_size):
+    iterator = iter(documents)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def document_id(document):
+    """
+    Returns the document's content fingerprint, used as its Chroma id.
+
+    Re-running an interrupted ingestion overwrites the chunks it already wrote instead of duplicating
+    them, and re-indexing a new edition can tell unchanged chunks from changed ones by id alone.
+    """
+    return hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+
+
+def _write_batch(collection, batch, vectors):
+    # Identical chunks share an id and Chroma rejects duplicate ids within one call
+    rows = {document_id(doc): (doc, vector) for doc, vector in zip(batch, vectors)}
+    collection.upsert(
+        ids=list(rows.keys()),
+        embeddings=[vector for _, vector in rows.values()],
+        documents=[doc.page_content for doc, _ in rows.values()],
+        metadatas=[doc.metadata for doc, _ in rows.values()],
+    )
+    return len(batch)
+
+
+def index_documents(collection, embeddings, documents, batch_size=None, max_workers=None, on_batch=None):
+    """
+    Embeds documents in batches on a worker pool and writes them to a Chroma collection in bulk.
+    At most max_workers batches are in flight at once, so memory stays bounded on large books.
+
+    Args:
+        collection (chromadb.Collection): Chroma collection to write to
+        embeddings (Embeddings): Embedding function used by the vector store
+        documents (Iterable[Document]): Documents to index, e.g. a streaming extractor
+        batch_size (int): Number of documents sent per embedding request
+        max_workers (int): Maximum number of batches embedded concurrently
+        on_batch (Callable[[list[Document]], None]): Called after each batch is written, in document order
+
+    Returns:
+        int: Number of documents indexed
+    """
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    max_workers = max_workers or settings.EMBEDDING_MAX_WORKERS
+
+    indexed = 0
+    start = time.perf_counter()
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, \
+            tqdm(total=getattr(documents, "__len__", lambda: None)(), desc="Adding documents to vector database", unit="doc") as progress:
+
+        def drain_one():
+            batch, future = pending.popleft()
+            written = _write_batch(collection, batch, future.result())
+            progress.update(written)
+            if on_batch:
+                on_batch(batch)
+            return written
+
+        for batch in _batched(documents, batch_size):
+            if len(pending) >= max_workers:
+                indexed += drain_one()
+            texts = [doc.page_content for doc in batch]
+            pending.append((batch, pool.submit(embeddings.embed_documents, texts)))
+
+        while pending:
+            indexed += drain_one()
+
+    elapsed = time.perf_counter() - start
+    rate = indexed / elapsed if elapsed > 0 else 0.0
+    print(f"Indexed {indexed} documents in {elapsed:.1f}s ({rate:.1f} documents/sec)")
+    return indexed
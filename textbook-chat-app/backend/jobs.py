@@ -0,0 +1,181 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+from backend.catalog import Textbook, TextbookCatalog
+from backend.redis_client import redis_client
+from backend.retrieval_cache import retrieval_cache
+
+_INT_FIELDS = ("pages_total", "pages_processed", "last_pdf_page", "chunks_added", "chunks_deleted", "chunks_moved")
+_FLOAT_FIELDS = ("pages_per_sec", "queued_at", "started_at", "updated_at", "finished_at")
+
+
+# Redis list the API processes push job ids onto and ingestion workers pop from
+_QUEUE_KEY = "ingest-queue"
+
+
+def _status_key(textbook_id: str) -> str:
+    return f"ingest:{textbook_id}"
+
+
+class IngestionQueue:
+    """
+    Runs textbook ingestion jobs in the background so uploads never block chat traffic.
+
+    Jobs wait in a Redis list and at most `concurrency` run at once, each on its own thread. Job
+    status and progress are checkpointed to a Redis hash per textbook after every indexed batch,
+    so after a crash or restart unfinished jobs are re-queued and resume from the last indexed page.
+
+    Any process can enqueue, but only processes started with `run_jobs` consume the queue. In a
+    multi-worker deployment the API workers only enqueue and a single `python -m backend.jobs`
+    process does the indexing, so only one process ever writes to the index.
+
+    Incremental jobs re-index an already indexed book in place (see retriever.reindex_textbook), and
+    the book keeps being served from its current index while they run.
+    """
+
+    def __init__(self, catalog: TextbookCatalog, concurrency: int,
+                 on_complete: Optional[Callable[[str], None]] = None, run_jobs: bool = True) -> None:
+        self.catalog = catalog
+        self.concurrency = concurrency
+        self.on_complete = on_complete
+        self.run_jobs = run_jobs
+        self._pending = set()
+        self._workers = []
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest")
+
+    async def start(self) -> None:
+        """
+        Starts the workers and re-queues jobs that were queued or running when the server stopped.
+        Does nothing unless this process runs jobs.
+        """
+        if not self.run_jobs:
+            return
+        # Job hashes are the source of truth; rebuild the list from them so nothing is lost or doubled
+        await redis_client.delete(_QUEUE_KEY)
+        async for key in redis_client.scan_iter(match=_status_key("*")):
+            textbook_id = key.split(":", 1)[1]
+            status = await self.status(textbook_id)
+            if self.catalog.get(textbook_id) is not None and status.get("status") in ("queued", "running"):
+                print(f"Re-queueing interrupted ingestion of {textbook_id}")
+                await redis_client.rpush(_QUEUE_KEY, textbook_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def status(self, textbook_id: str) -> dict:
+        """
+        Returns the textbook's ingestion status, or an empty dict if it was never queued.
+        """
+        status = await redis_client.hgetall(_status_key(textbook_id))
+        for field in _INT_FIELDS:
+            if field in status:
+                status[field] = int(status[field])
+        for field in _FLOAT_FIELDS:
+            if field in status:
+                status[field] = float(status[field])
+        return status
+
+    async def enqueue(self, book: Textbook, incremental: bool = False) -> dict:
+        """
+        Queues a textbook for ingestion unless it is already queued or running.
+        """
+        status = await self.status(book.id)
+        if status.get("status") not in ("queued", "running"):
+            mode = "incremental" if incremental else "full"
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.delete(_status_key(book.id))
+            pipe.hset(_status_key(book.id), mapping={"status": "queued", "mode": mode, "queued_at": time.time()})
+            pipe.rpush(_QUEUE_KEY, book.id)
+            await pipe.execute()
+        return await self.status(book.id)
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                # Short blocking pops stay well inside the Redis socket timeout
+                popped = await redis_client.blpop(_QUEUE_KEY, timeout=1)
+                if popped is None:
+                    continue
+                textbook_id = popped[1]
+                status = await self.status(textbook_id)
+                book = self.catalog.get(textbook_id)
+                # Skip duplicates of jobs that already ran or are running on another worker task
+                if book is None or textbook_id in self._pending or status.get("status") not in ("queued", "running"):
+                    continue
+                self._pending.add(textbook_id)
+                try:
+                    await self._run(book, status.get("mode") == "incremental")
+                finally:
+                    self._pending.discard(textbook_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # e.g. Redis restarting; keep consuming. A job cut short stays "running" and is
+                # re-queued on the next start.
+                print(f"Ingestion worker error: {e}")
+                await asyncio.sleep(1)
+
+    async def _set_status(self, textbook_id: str, **fields) -> None:
+        try:
+            await redis_client.hset(_status_key(textbook_id), mapping=fields)
+        except Exception as e:
+            print(f"Could not record ingestion status of {textbook_id}: {e}")
+
+    async def _run(self, book: Textbook, incremental: bool) -> None:
+        loop = asyncio.get_running_loop()
+        previous = await self.status(book.id)
+
+        def progress(stage, **fields):
+            # Called from the ingestion thread; wait for the write so the checkpoint is durable.
+            # A write that fails only costs progress reporting, never the job.
+            fields = {"stage": stage, "updated_at": time.time(), **fields}
+            asyncio.run_coroutine_threadsafe(self._set_status(book.id, **fields), loop).result()
+
+        await self._set_status(book.id, status="running", started_at=time.time())
+        # Imported here so the API process doesn't load PyPDF2/chromadb until a job runs
+        from backend.retriever import ingest_textbook, reindex_textbook
+
+        if incremental:
+            # Diffing is idempotent, so an interrupted incremental job simply starts over
+            job = partial(reindex_textbook, book.path, book.collection, progress)
+        else:
+            job = partial(ingest_textbook, book.path, book.collection, progress, previous.get("last_pdf_page", 0))
+        try:
+            await loop.run_in_executor(self._executor, job)
+        except Exception as e:
+            print(f"Ingestion of {book.id} failed: {e}")
+            await self._set_status(book.id, status="failed", error=str(e), finished_at=time.time())
+            return
+
+        # Cached retrieval results came from the old index
+        await retrieval_cache.bump(book.collection)
+        await self._set_status(book.id, status="done", stage="done", finished_at=time.time())
+        print(f"Ingestion of {book.id} finished")
+        if self.on_complete:
+            self.on_complete(book.id)
+
+
+async def _serve() -> None:
+    from backend.catalog import DEFAULT_TEXTBOOK
+    from backend.config import settings
+
+    catalog = TextbookCatalog(settings.TEXTBOOK_CATALOG_PATH, settings.TEXTBOOK_PUBLIC_DIR, DEFAULT_TEXTBOOK)
+    queue = IngestionQueue(catalog, concurrency=settings.INGEST_CONCURRENCY)
+    await queue.start()
+    print(f"Ingestion worker started with concurrency {settings.INGEST_CONCURRENCY}")
+    try:
+        await asyncio.gather(*queue._workers)
+    finally:
+        await queue.stop()
+
+
+if __name__ == "__main__":
+    # Standalone ingestion worker for multi-worker deployments (see gunicorn.conf.py):
+    #   RUN_INGESTION=true python -m backend.jobs
+    asyncio.run(_serve())
@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.compressors import tokenize
+
+
+def matches_filter(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """
+    Evaluates the subset of Chroma's where syntax used for scoping: field equality and $and.
+    """
+    for key, value in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in value):
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+
+def current_version(path: str) -> str:
+    """
+    Returns the directory holding the index files currently published at `path`.
+
+    Each save writes a new version directory and atomically repoints the `current` symlink at it, so
+    readers never see a half-written index and indexes already loaded (and memory-mapped) keep
+    reading their own, unchanged files. Indexes saved before versioning live directly in `path`.
+    """
+    link = os.path.join(path, "current")
+    return os.path.realpath(link) if os.path.islink(link) else path
+
+
+class LexicalIndexBuilder:
+    """
+    Accumulates documents during ingestion and writes a BM25 inverted index next to the Chroma collection.
+
+    On disk the index is a vocabulary (term -> slot), per-term offsets into flat postings and term
+    frequency arrays, per-document lengths, and the documents themselves as JSON lines. Saving never
+    modifies files of a published version (see current_version), so it is safe while the book is served.
+    """
+
+    def __init__(self) -> None:
+        self.documents: List[Document] = []
+        self.term_counts: List[Counter] = []
+
+    def add(self, document: Document) -> None:
+        self.documents.append(document)
+        self.term_counts.append(Counter(tokenize(document.page_content)))
+
+    def track(self, documents: Iterable[Document]):
+        """
+        Yields documents unchanged while adding them to the index, so it can sit in a streaming pipeline.
+        """
+        for document in documents:
+            self.add(document)
+            yield document
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        # Written under a temporary name so concurrent builders never prune each other's work
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=path)
+        self._write(staging)
+        version = staging.replace(".staging-", "v-")
+        os.rename(staging, version)
+
+        previous = current_version(path)
+        link = os.path.join(path, f".current-{os.getpid()}")
+        os.symlink(os.path.basename(version), link)
+        os.replace(link, os.path.join(path, "current"))
+        _prune_versions(path, keep={os.path.realpath(version), os.path.realpath(previous)})
+        print(f"Lexical index saved to {version} ({len(self.documents)} documents)")
+
+    def _write(self, path: str) -> None:
+
+        postings: Dict[str, List[int]] = {}
+        for doc_id, counts in enumerate(self.term_counts):
+            for term in counts:
+                postings.setdefault(term, []).append(doc_id)
+
+        vocab = {}
+        offsets = [0]
+        doc_ids, freqs = [], []
+        for slot, (term, ids) in enumerate(sorted(postings.items())):
+            vocab[term] = slot
+            doc_ids.extend(ids)
+            freqs.extend(self.term_counts[i][term] for i in ids)
+            offsets.append(len(doc_ids))
+
+        np.save(os.path.join(path, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        np.save(os.path.join(path, "postings.npy"), np.asarray(doc_ids, dtype=np.int32))
+        np.save(os.path.join(path, "freqs.npy"), np.asarray(freqs, dtype=np.float32))
+        np.save(
+            os.path.join(path, "doc_lengths.npy"),
+            np.asarray([sum(c.values()) for c in self.term_counts], dtype=np.float32),
+        )
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(vocab, f)
+        with open(os.path.join(path, "documents.jsonl"), "w", encoding="utf-8") as f:
+            for doc in self.documents:
+                f.write(json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}) + "\n")
+
+
+def _prune_versions(path: str, keep) -> None:
+    # The previous version is kept so a reader that resolved it just before the swap can finish
+    # loading; deleting older ones is safe for readers that mapped them, as the files stay open.
+    for name in os.listdir(path):
+        version = os.path.join(path, name)
+        if name.startswith("v-") and os.path.realpath(version) not in keep:
+            shutil.rmtree(version, ignore_errors=True)
+
+
+class LexicalIndex:
+    """
+    Read-only BM25 index. The postings arrays are memory-mapped, so loading is near-instant and
+    pages are shared between worker processes through the OS page cache.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        # Resolved once, so every file below comes from the same version
+        path = current_version(path)
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+        self.freqs = np.load(os.path.join(path, "freqs.npy"), mmap_mode="r")
+        self.doc_lengths = np.load(os.path.join(path, "doc_lengths.npy"), mmap_mode="r")
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(path, "documents.jsonl"), "r", encoding="utf-8") as f:
+            self.documents = [Document(**json.loads(line)) for line in f]
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(current_version(path), "documents.jsonl"))
+
+    def search(self, query: str, k: int, where: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Returns the k best BM25 matches for the query, optionally restricted by a metadata filter.
+        """
+        n = len(self.documents)
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            slot = self.vocab.get(term)
+            if slot is None:
+                continue
+            start, end = self.offsets[slot], self.offsets[slot + 1]
+            ids = self.postings[start:end]
+            tf = self.freqs[start:end]
+            idf = np.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[ids] / self.avg_length)
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if where:
+            allowed = np.fromiter((matches_filter(d.metadata, where) for d in self.documents), dtype=bool, count=n)
+            scores[~allowed] = 0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k)[:k]]
+        return [self.documents[i] for i in matched[np.argsort(-scores[matched])]]
+
+
+class LexicalRetriever(BaseRetriever):
+    index: Any
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        return self.index.search(query, self.k, where=filter)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses vector and lexical results with reciprocal rank fusion and returns the top k.
+    """
+
+    vector_retriever: BaseRetriever
+    lexical_retriever: BaseRetriever
+    k: int = 4
+    rrf_k: int = 60
+
+    def _fuse(self, result_lists: List[List[Document]]) -> List[Document]:
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for results in result_lists:
+            for rank, doc in enumerate(results):
+                key = doc.page_content
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                documents.setdefault(key, doc)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [documents[key] for key in ranked[: self.k]]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        config = {"callbacks": run_manager.get_child()}
+        return self._fuse([
+            self.vector_retriever.invoke(query, config=config, **kwargs),
+            self.lexical_retriever.invoke(query, config=config, **kwargs),
+        ])
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager, **kwargs: Any) -> List[Document]:
+        config = {"callbacks": run_manager.get_child()}
+        vector_results = await self.vector_retriever.ainvoke(query, config=config, **kwargs)
+        # Lexical lookups are in-memory and fast enough to run inline
+        lexical_results = self.lexical_retriever.invoke(query, config=config, **kwargs)
+        return self._fuse([vector_results, lexical_results])
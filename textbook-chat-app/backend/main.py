@@ -1,37 +1,179 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import time
+import httpx
 import jwt
 import json
 
-from backend.redis_client import redis_client
+from backend.redis_client import binary_connection_pool, connection_pool, redis_client
 
+from backend.models.user import UserIdentity
+from backend.passwords import password_hasher
+from backend.retrieval_cache import CachedRetriever, retrieval_cache
 from backend.routes.auth import get_user_by_id
+from backend.user_cache import user_cache
 from backend.routes.auth import router as auth_router
 
-from openai import OpenAI
 import os
 
-from langchain_openai import ChatOpenAI
-from langchain_community.chat_message_histories import RedisChatMessageHistory
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
 
-import backend.retriever
-
-from backend.graph import build_graph
+# langchain_openai, langgraph, chromadb and PyPDF2 are imported where they're first needed
+# (the lifespan hook and load_textbook), so importing this module stays fast.
+from backend.catalog import (
+    DEFAULT_TEXTBOOK, LoadedTextbook, Textbook, TextbookCatalog, TextbookNotIndexed, TextbookRegistry,
+)
+from backend.concurrency import ChatCoordinator, ChatOverloaded, ChatTurn
+from backend.config import settings
+from backend.context import ContextManager
+from backend.history import AsyncRedisChatMessageHistory
+from backend.jobs import IngestionQueue
 
 from dotenv import load_dotenv
 from pathlib import Path
 load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
 
-retriever = backend.retriever.create_retriever("data/Physics-WEB_Sab7RrQ.pdf", "Physics")
+def load_textbook(llm, checkpointer, book: Textbook) -> LoadedTextbook:
+    """
+    Builds a textbook's retriever and compiled agent graphs. Runs on first use of the book.
+    """
+    import backend.retriever
+    from backend.graph import build_graph
+    from backend.tools import get_tools
+
+    retriever = backend.retriever.create_retriever(book.path, book.collection, ingest=False)
+    if settings.RETRIEVAL_CACHE_ENABLED:
+        retriever = CachedRetriever(retriever=retriever, cache=retrieval_cache, collection=book.collection)
+    tools = get_tools(retriever, backend.retriever.load_section_index(book.collection))
+    # With CHECKPOINTER=redis, authenticated sessions keep their checkpoint between requests, keyed by thread_id.
+    # Anonymous requests all share one session id, so they get a stateless graph instead.
+    return LoadedTextbook(
+        book=book,
+        retriever=retriever,
+        graph=build_graph(llm, tools, checkpointer=checkpointer),
+        anonymous_graph=build_graph(llm, tools, checkpointer=None),
+    )
+
+
+async def warmup(app: FastAPI):
+    """
+    Loads the textbooks in settings.WARMUP_TEXTBOOKS so the first chats don't pay for it, then marks
+    the app ready. Books that aren't indexed yet are queued for ingestion instead.
+    """
+    start = time.perf_counter()
+    for textbook_id in settings.WARMUP_TEXTBOOKS:
+        try:
+            await app.state.textbooks.get(textbook_id)
+        except TextbookNotIndexed:
+            await app.state.ingestion.enqueue(app.state.textbooks.catalog.get(textbook_id))
+        except Exception as e:
+            print(f"Warmup of textbook {textbook_id} failed: {e}")
+    app.state.ready.set()
+    print(f"Warmup finished in {time.perf_counter() - start:.1f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Builds the LLM client and the textbook registry once and shares them across requests.
+    """
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from backend.checkpointer import create_checkpointer
+    from backend.semantic_cache import SemanticCache
+
+    # Sync work that langchain offloads (e.g. Chroma queries) runs on the loop's default executor,
+    # so bound it to keep a burst of chats from spawning unbounded threads.
+    executor = ThreadPoolExecutor(max_workers=settings.CHAT_THREAD_POOL_SIZE, thread_name_prefix="chat")
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    http_client = httpx.Client()
+    http_async_client = httpx.AsyncClient()
+    llm = ChatOpenAI(
+        model="gpt-4o",
+        temperature=0,
+        streaming=True,
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+    # Textbooks are loaded on first use, so startup cost doesn't grow with the catalog
+    catalog = TextbookCatalog(settings.TEXTBOOK_CATALOG_PATH, settings.TEXTBOOK_PUBLIC_DIR, DEFAULT_TEXTBOOK)
+    app.state.textbooks = TextbookRegistry(
+        catalog,
+        # One checkpointer (if any) for every book; with CHECKPOINTER=redis it is shared by all workers too
+        loader=partial(load_textbook, llm, create_checkpointer()),
+        max_loaded=settings.MAX_LOADED_TEXTBOOKS,
+    )
+    # Books are indexed in the background; a finished job drops any stale loaded copy.
+    # Extra API workers only enqueue and leave indexing to the single ingestion worker.
+    app.state.ingestion = IngestionQueue(
+        catalog,
+        concurrency=settings.INGEST_CONCURRENCY,
+        on_complete=app.state.textbooks.invalidate,
+        run_jobs=settings.RUN_INGESTION,
+    )
+    await app.state.ingestion.start()
+    await user_cache.start()
+    app.state.context = ContextManager(
+        llm,
+        ChatOpenAI(
+            model=settings.SUMMARY_MODEL,
+            temperature=0,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        ),
+        max_turns=settings.CHAT_HISTORY_TURNS,
+        token_budget=settings.CHAT_TOKEN_BUDGET,
+        batch_turns=settings.CHAT_SUMMARY_BATCH_TURNS,
+    )
+    app.state.semantic_cache = SemanticCache(
+        OpenAIEmbeddings(
+            model=settings.SEMANTIC_CACHE_EMBEDDING_MODEL,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        ),
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+    )
+    app.state.chat = ChatCoordinator(
+        max_concurrency=settings.CHAT_MAX_CONCURRENCY,
+        max_queue=settings.CHAT_MAX_QUEUE,
+    )
+    print("Chat services initialized")
+
+    app.state.ready = asyncio.Event()
+    if settings.WARMUP_IN_BACKGROUND:
+        # Serve liveness and auth right away; /readyz reports when the textbooks are loaded
+        warmup_task = asyncio.create_task(warmup(app))
+    else:
+        await warmup(app)
+        warmup_task = None
+
+    yield
+
+    if warmup_task:
+        warmup_task.cancel()
+    await app.state.ingestion.stop()
+    await user_cache.stop()
+    password_hasher.shutdown()
+    http_client.close()
+    await http_async_client.aclose()
+    executor.shutdown(wait=False)
+    await connection_pool.disconnect()
+    await binary_connection_pool.disconnect()
 
 
 # Create FastAPI app
-app = FastAPI(title="TextbookAI API")
+app = FastAPI(title="TextbookAI API", lifespan=lifespan)
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 
 # Add CORS middleware
@@ -71,10 +213,14 @@ class TokenData(BaseModel):
 
 class ChatMessage(BaseModel):
     message: str
+    textbook_id: Optional[str] = None  # Defaults to settings.DEFAULT_TEXTBOOK_ID
+    use_cache: bool = True  # Set to False to always run the agent
 
 class ChatResponse(BaseModel):
     response: str
     saved: bool = False
+    cached: bool = False
+    coalesced: bool = False  # Shared the reply of an identical request that was already running
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
@@ -138,6 +284,35 @@ async def get_current_active_user(current_user: Optional[User] = Depends(get_cur
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def _token_user_id(token: str) -> str:
+    """
+    Verifies the JWT's signature and expiry and returns the user id it was issued for.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token is missing user information")
+    return user_id
+
+async def get_current_identity(token: str = Depends(oauth2_scheme)) -> Optional[UserIdentity]:
+    """
+    Cheap authentication for hot endpoints: verifies the token and returns the caller's id and
+    username from the in-process user cache, without loading the full user record.
+    Returns None for unauthenticated requests.
+    """
+    if token is None:
+        return None
+
+    identity = await user_cache.get(_token_user_id(token))
+    if identity is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    if identity.disabled:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return identity
+
 # Routes
 
 @app.get("/users/me", response_model=User)
@@ -153,45 +328,297 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
         )
     return current_user
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_with_textbooks(
-    message: ChatMessage,
-    current_user: Optional[User] = Depends(get_current_active_user)
-):
+def _textbook_id(message: ChatMessage) -> str:
+    return message.textbook_id or settings.DEFAULT_TEXTBOOK_ID
+
+def _not_ready(textbook_id: str, job: dict) -> HTTPException:
+    if job.get("status") == "failed":
+        detail = f"Indexing textbook {textbook_id} failed: {job.get('error')}"
+    else:
+        detail = (
+            f"Textbook {textbook_id} is still being indexed "
+            f"({job.get('pages_processed', 0)}/{job.get('pages_total', '?')} pages)"
+        )
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": "30"})
+
+async def _get_textbook(request: Request, message: ChatMessage) -> LoadedTextbook:
+    textbook_id = _textbook_id(message)
+    ingestion = request.app.state.ingestion
+    job = await ingestion.status(textbook_id)
+    # Incremental re-indexing updates a complete index in place, so the book stays available
+    if job and job.get("status") != "done" and job.get("mode") != "incremental":
+        raise _not_ready(textbook_id, job)
+
+    registry = request.app.state.textbooks
+    try:
+        textbook = await registry.get(textbook_id)
+        # Re-indexed since this worker loaded it (possibly by another process): reload it
+        if job.get("finished_at", 0) > textbook.loaded_at:
+            registry.invalidate(textbook_id)
+            textbook = await registry.get(textbook_id)
+        return textbook
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Textbook {textbook_id} not found")
+    except TextbookNotIndexed:
+        # Never indexed: queue it instead of blocking this request on a full ingestion. A failed job
+        # stays failed until it is queued again explicitly, so a broken PDF isn't retried forever.
+        if job.get("status") != "failed":
+            job = await ingestion.enqueue(registry.catalog.get(textbook_id))
+        raise _not_ready(textbook_id, job)
+
+async def _prepare_chat(request: Request, message: ChatMessage, current_user: Optional[UserIdentity]):
+    """
+    Picks the graph for the caller and builds the graph input and config for a chat turn.
+    """
     if not message.message:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
 
     session_id = current_user.id if current_user else "anonymous"
+    config = {"configurable": {"thread_id": session_id}}
 
-    history = RedisChatMessageHistory(
-        session_id=session_id,
-        url="redis://localhost:6379"
-    )
-    previous_messages = history.messages if history.messages else []
+    history = AsyncRedisChatMessageHistory(session_id)
+    new_message = HumanMessage(content=message.message)
+
+    textbook = await _get_textbook(request, message)
+    if current_user is None:
+        graph = textbook.anonymous_graph
+        messages = [new_message]
+    else:
+        graph = textbook.graph
+        messages = await request.app.state.context.build_messages(session_id, history, new_message)
+        if graph.checkpointer is not None:
+            # Redis history is the source of truth, so drop the previous turn's checkpointed
+            # messages and let the context stage decide what the agent sees this turn.
+            state = await graph.aget_state(config)
+            stale = [RemoveMessage(id=m.id) for m in state.values.get("messages", [])]
+            messages = stale + messages
+
+    return graph, {"messages": messages}, config, history
+
+async def _cached_answer(request: Request, message: ChatMessage, current_user: Optional[UserIdentity]):
+    """
+    Returns a previous answer to a near-identical question about the textbook, if there is one, and
+    the question's embedding for _cache_answer (None when the question can't use the cache).
+
+    Replies depend on the conversation so far, so only opening questions are looked up and stored:
+    anonymous chats are stateless, and authenticated ones must have no history yet. Short messages
+    ("yes", "quiz me") only make sense in context and are never cached.
+    """
+    cache = request.app.state.semantic_cache
+    if not message.message:
+        return None, None
+    if not message.use_cache or len(message.message.strip()) < settings.SEMANTIC_CACHE_MIN_QUESTION_CHARS:
+        cache.record_bypass()
+        return None, None
+    if current_user is not None and await AsyncRedisChatMessageHistory(current_user.id).alen() > 0:
+        cache.record_bypass()
+        return None, None
+    entry, vector = await cache.alookup(_textbook_id(message), message.message)
+    return (entry.answer if entry else None), vector
+
+async def _cache_answer(request: Request, message: ChatMessage, context: List[str], reply: str, vector):
+    # Only answers grounded in retrieved textbook content are worth reusing
+    if vector is not None and context and reply:
+        await request.app.state.semantic_cache.astore(
+            _textbook_id(message), message.message, "\n\n".join(context), reply, vector=vector
+        )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-    previous_messages.append(HumanMessage(content=message.message))
+def _turn_key(message: ChatMessage, current_user: Optional[UserIdentity]):
+    return (current_user.id if current_user else "anonymous", _textbook_id(message), message.message)
 
-    llm = ChatOpenAI(model="gpt-4o", temperature=0, streaming=True)
-    graph = build_graph(llm, retriever)
+async def _save_cached_answer(request: Request, message: ChatMessage, current_user: Optional[UserIdentity],
+                              cached: str) -> bool:
+    """
+    Saves a cached reply to an authenticated user's history under the session lock, so it can't
+    interleave with a turn of the same session. Returns False if an earlier turn saved messages
+    since the lookup; the cached reply doesn't fit the conversation anymore and the turn must run.
+    """
+    if current_user is None:
+        return True
+    history = AsyncRedisChatMessageHistory(current_user.id)
+    async with request.app.state.chat.session(current_user.id):
+        if await history.alen() > 0:
+            return False
+        await history.aadd_messages([HumanMessage(content=message.message), AIMessage(content=cached)])
+    return True
+
+async def _begin_turn(request: Request, message: ChatMessage, current_user: Optional[UserIdentity]) -> ChatTurn:
+    """
+    Waits for this session's previous turn and a free agent slot. Anonymous turns are stateless,
+    so they aren't ordered per session.
+    """
+    try:
+        return await request.app.state.chat.begin(
+            current_user.id if current_user else None, _turn_key(message, current_user)
+        )
+    except ChatOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"}
+        )
 
-    reply = ""
-    for event in graph.stream(
-        {"messages": previous_messages},
-        {"configurable": {"thread_id": session_id}}
-    ):
-        for value in event.values():
-            reply = value["messages"][-1].content
+class TurnStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that always finishes its chat turn, even if the client disconnects before the
+    body starts streaming, so the session's next turn is never left waiting.
+    """
+
+    def __init__(self, content, turn: ChatTurn, coordinator: ChatCoordinator, **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self.turn = turn
+        self.coordinator = coordinator
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # No-op if the stream already finished the turn
+            self.coordinator.finish(self.turn, error=RuntimeError("The original request ended without a reply"))
 
+@app.post("/chat", response_model=ChatResponse)
+async def chat_with_textbooks(
+    message: ChatMessage,
+    request: Request,
+    current_user: Optional[UserIdentity] = Depends(get_current_identity)
+):
     saved = current_user is not None
-    if saved:
-        history.add_user_message(message.message)
-        history.add_ai_message(reply)
+    cached, question_vector = await _cached_answer(request, message, current_user)
+    if cached is not None:
+        if await _save_cached_answer(request, message, current_user, cached):
+            return {"response": cached, "saved": saved, "cached": True}
+        question_vector = None
+
+    # A double-submitted message shares the running turn's reply, which that turn already saves
+    coordinator = request.app.state.chat
+    pending = coordinator.pending(_turn_key(message, current_user))
+    if pending is not None:
+        return {"response": await coordinator.join(pending), "saved": saved, "coalesced": True}
+
+    turn = await _begin_turn(request, message, current_user)
+    try:
+        graph, inputs, config, history = await _prepare_chat(request, message, current_user)
+
+        reply = ""
+        context = []
+        async for event in graph.astream(inputs, config):
+            for node, value in event.items():
+                reply = value["messages"][-1].content
+                if node == "tools":
+                    context.extend(m.content for m in value["messages"])
+
+        if saved:
+            await history.aadd_messages([HumanMessage(content=message.message), AIMessage(content=reply)])
+        await _cache_answer(request, message, context, reply, question_vector)
+    except BaseException as e:
+        coordinator.finish(turn, error=e)
+        raise
+    coordinator.finish(turn, reply)
 
     return {"response": reply, "saved": saved}
 
 
+@app.post("/chat/stream")
+async def stream_chat_with_textbooks(
+    message: ChatMessage,
+    request: Request,
+    current_user: Optional[UserIdentity] = Depends(get_current_identity)
+):
+    """
+    Streams the agent's reply as server-sent events.
+
+    Emits "token" events as the model generates text, "tool_start"/"tool_end" events while the
+    textbook is searched, and a final "done" event carrying the full reply once it has been saved.
+    """
+    saved = current_user is not None
+    cached, question_vector = await _cached_answer(request, message, current_user)
+    if cached is not None:
+        if await _save_cached_answer(request, message, current_user, cached):
+            async def cached_stream():
+                yield _sse("token", {"content": cached})
+                yield _sse("done", {"response": cached, "saved": saved, "cached": True})
+
+            return StreamingResponse(cached_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+        question_vector = None
+
+    coordinator = request.app.state.chat
+    pending = coordinator.pending(_turn_key(message, current_user))
+    if pending is not None:
+        async def coalesced_stream():
+            try:
+                reply = await coordinator.join(pending)
+            except Exception as e:
+                yield _sse("error", {"detail": str(e)})
+                return
+            yield _sse("token", {"content": reply})
+            yield _sse("done", {"response": reply, "saved": saved, "coalesced": True})
+
+        return StreamingResponse(coalesced_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    # The turn is held from here until the stream ends, so the next turn sees this one's history
+    turn = await _begin_turn(request, message, current_user)
+    try:
+        graph, inputs, config, history = await _prepare_chat(request, message, current_user)
+    except BaseException as e:
+        coordinator.finish(turn, error=e)
+        raise
+
+    async def event_stream():
+        tokens = []
+        context = []
+        try:
+            async for event in graph.astream_events(inputs, config, version="v2"):
+                kind = event["event"]
+                if kind == "on_chat_model_start":
+                    # Only the last model call's text is the reply; earlier calls decide on tools
+                    tokens = []
+                elif kind == "on_chat_model_stream":
+                    content = event["data"]["chunk"].content
+                    if content:
+                        tokens.append(content)
+                        yield _sse("token", {"content": content})
+                elif kind == "on_tool_start":
+                    yield _sse("tool_start", {"name": event["name"], "input": event["data"].get("input")})
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    context.append(str(getattr(output, "content", output)))
+                    yield _sse("tool_end", {"name": event["name"]})
+        except Exception as e:
+            coordinator.finish(turn, error=e)
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        reply = "".join(tokens)
+        if saved:
+            await history.aadd_messages([HumanMessage(content=message.message), AIMessage(content=reply)])
+        await _cache_answer(request, message, context, reply, question_vector)
+        coordinator.finish(turn, reply)
+
+        yield _sse("done", {"response": reply, "saved": saved})
+
+    return TurnStreamingResponse(
+        event_stream(),
+        turn,
+        coordinator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/chat/history")
-async def get_chat_history(current_user: User = Depends(get_current_active_user)):
+async def get_chat_history(
+    before: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    current_user: Optional[UserIdentity] = Depends(get_current_identity),
+):
+    """
+    Returns the user's chat history, oldest first.
+
+    Each message carries a `position` that never changes. With `limit`, returns at most that many
+    messages before the `before` position (the newest ones if omitted); pass the oldest returned
+    position as `before` to load the previous page. Without `limit`, returns the whole history.
+    """
     if current_user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -200,16 +627,19 @@ async def get_chat_history(current_user: User = Depends(get_current_active_user)
         )
 
     try:
-        history = RedisChatMessageHistory(
-            session_id=current_user.id,
-            url="redis://localhost:6379",
-        )
-        chat_history = history.messages  # List of HumanMessage / AIMessage objects
+        history = AsyncRedisChatMessageHistory(current_user.id)
+        if limit is None:
+            first = await history.atrimmed()
+            records = await history.aget_records(0, -1)
+        else:
+            first, records = await history.apage(before, limit)
         return [
             {
-                "role": "user" if isinstance(m, HumanMessage) else "assistant",
-                "content": m.content
-            } for m in chat_history
+                "role": "user" if r.role == "human" else "assistant",
+                "content": r.content,
+                "timestamp": r.timestamp,
+                "position": first + i,
+            } for i, r in enumerate(records)
         ]
     except Exception as e:
         raise HTTPException(
@@ -218,6 +648,129 @@ async def get_chat_history(current_user: User = Depends(get_current_active_user)
         )
 
 
+@app.get("/textbooks")
+async def list_textbooks(request: Request):
+    """
+    Lists the textbooks the backend can serve and whether each is currently loaded.
+    """
+    registry = request.app.state.textbooks
+    loaded = set(registry.loaded())
+    return [
+        {"id": book.id, "title": book.title, "loaded": book.id in loaded}
+        for book in registry.catalog.all()
+    ]
+
+
+@app.post("/textbooks/{textbook_id}/ingest", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_textbook(
+    textbook_id: str,
+    request: Request,
+    incremental: bool = False,
+    current_user: Optional[UserIdentity] = Depends(get_current_identity),
+):
+    """
+    Queues a textbook from the catalog for background ingestion.
+
+    With incremental=true an already indexed book is diffed against its PDF and only changed
+    chunks are deleted, re-embedded and added, e.g. after a new edition replaced the file. Books that
+    finished indexing are always re-indexed incrementally, so they stay available meanwhile.
+    """
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required to queue ingestion",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    book = request.app.state.textbooks.catalog.get(textbook_id)
+    if book is None:
+        raise HTTPException(status_code=404, detail=f"Textbook {textbook_id} not found")
+    ingestion = request.app.state.ingestion
+    if (await ingestion.status(textbook_id)).get("status") == "done":
+        incremental = True
+    return await ingestion.enqueue(book, incremental=incremental)
+
+
+@app.get("/textbooks/{textbook_id}/status")
+async def textbook_status(textbook_id: str, request: Request):
+    """
+    Returns a textbook's ingestion status: stage, pages processed out of the total, and throughput.
+    """
+    if request.app.state.textbooks.catalog.get(textbook_id) is None:
+        raise HTTPException(status_code=404, detail=f"Textbook {textbook_id} not found")
+    job = await request.app.state.ingestion.status(textbook_id)
+    return job or {"status": "not_queued"}
+
+
+@app.get("/healthz")
+async def liveness():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readiness(request: Request):
+    """
+    Readiness probe: warmup has finished and Redis is reachable.
+    """
+    if not request.app.state.ready.is_set():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Warming up")
+    try:
+        await redis_client.ping()
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Redis unavailable: {e}")
+    return {"status": "ready", "textbooks": request.app.state.textbooks.loaded()}
+
+
+@app.get("/metrics/redis")
+async def redis_pool_metrics():
+    """
+    Returns connection pool usage for this worker.
+    """
+    return {**connection_pool.stats(), "binary": binary_connection_pool.stats()}
+
+
+@app.get("/metrics/chat")
+async def chat_concurrency_metrics(request: Request):
+    """
+    Returns running and queued chat turns, queue depth and coalesced requests for this worker.
+    """
+    return request.app.state.chat.stats()
+
+
+@app.get("/metrics/user-cache")
+async def user_cache_metrics():
+    """
+    Returns hit/miss counters for this worker's user cache.
+    """
+    return user_cache.stats()
+
+
+@app.get("/metrics/passwords")
+async def password_hasher_metrics():
+    """
+    Returns the bcrypt cost, average hashing time and logins waiting for a hashing thread.
+    """
+    return password_hasher.stats()
+
+
+@app.get("/metrics/retrieval-cache")
+async def retrieval_cache_metrics():
+    """
+    Returns hit counters per tier and the current index generation of each textbook.
+    """
+    return retrieval_cache.stats()
+
+
+@app.get("/metrics/semantic-cache")
+async def semantic_cache_metrics(request: Request):
+    """
+    Returns hit/miss counters and entry counts for the semantic answer cache.
+    """
+    return request.app.state.semantic_cache.stats()
+
+
 # Run the application
 if __name__ == "__main__":
     import uvicorn
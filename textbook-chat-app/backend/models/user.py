@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
@@ -15,3 +16,12 @@ class User(UserBase):
 class UserInDB(User):
     hashed_password: str
 
+@dataclass(frozen=True)
+class UserIdentity:
+    """
+    Slim view of a user for hot endpoints that only need to know who is calling (e.g. /chat).
+    Plain dataclass rather than a pydantic model, and never carries the password hash.
+    """
+    id: str
+    username: str
+    disabled: bool = False
@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import hmac
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import bcrypt
+
+from backend.config import settings
+
+# Accounts registered before bcrypt store an unsalted SHA-256 hex digest
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with bcrypt on a small dedicated thread pool.
+
+    bcrypt is deliberately slow (about 250ms at 12 rounds), so running it on the event loop would
+    stall every other request during a burst of logins. bcrypt releases the GIL while hashing, so
+    `max_workers` threads hash in parallel, and excess logins queue for a thread instead of competing
+    with chat traffic for the loop's default executor.
+
+    `rounds` is bcrypt's cost factor. When it changes, verify() reports that the stored hash should be
+    upgraded, and hashes from the old SHA-256 scheme are upgraded the same way.
+    """
+
+    def __init__(self, rounds: int, max_workers: int) -> None:
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.operations = 0
+        self.time_total = 0.0
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.operations += 1
+            self.time_total += time.perf_counter() - start
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def _verify(self, password: str, hashed: str) -> Tuple[bool, bool]:
+        if _LEGACY_SHA256.match(hashed):
+            digest = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(digest, hashed), True
+        try:
+            ok = bcrypt.checkpw(password.encode(), hashed.encode())
+        except ValueError:
+            return False, False
+        return ok, ok and self.cost(hashed) != self.rounds
+
+    @staticmethod
+    def cost(hashed: str) -> int:
+        # bcrypt hashes look like $2b$12$<salt and digest>
+        return int(hashed.split("$")[2])
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, self._hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, bool]:
+        """
+        Checks a password against a stored hash.
+
+        Returns:
+            Tuple[bool, bool]: Whether the password matches, and whether the stored hash should be
+                replaced with hash(password) because it uses an old scheme or cost
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, self._verify, password, hashed)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "operations": self.operations,
+            "avg_ms": self.time_total / self.operations * 1000 if self.operations else 0.0,
+            "queued": self._executor._work_queue.qsize(),
+        }
+
+
+# One pool per process, shared by login and registration
+password_hasher = PasswordHasher(rounds=settings.PASSWORD_HASH_ROUNDS, max_workers=settings.PASSWORD_HASH_WORKERS)
@@ -1,4 +1,69 @@
 # redis_client.py
+import time
+
 import redis.asyncio as redis
 
-redis_client = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
+from backend.config import settings
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """
+    Blocking connection pool that records how long callers wait to check out a connection.
+
+    Once max_connections are in use, callers wait up to `timeout` seconds for one to be released
+    instead of opening new connections, so Redis sees a stable number of clients under load.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        connection = await super().get_connection(*args, **kwargs)
+        waited = time.perf_counter() - start
+        self.checkouts += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        return connection
+
+    def stats(self) -> dict:
+        """
+        Returns in-use/idle connection counts and checkout wait times in milliseconds.
+        """
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "checkouts": self.checkouts,
+            "wait_ms_avg": self.wait_time_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_ms_max": self.wait_time_max * 1000,
+        }
+
+
+def _pool(max_connections: int, decode_responses: bool) -> InstrumentedConnectionPool:
+    return InstrumentedConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=max_connections,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        decode_responses=decode_responses,
+    )
+
+
+# Responses are decoded per connection, so text and binary data need separate pools. They split
+# REDIS_MAX_CONNECTIONS between them, so a process never opens more than that in total.
+_binary_connections = max(1, min(settings.REDIS_BINARY_CONNECTIONS, settings.REDIS_MAX_CONNECTIONS - 1))
+
+# One pool per process for text data, shared by the auth routes, caches and job status
+connection_pool = _pool(max(settings.REDIS_MAX_CONNECTIONS - _binary_connections, 1), decode_responses=True)
+
+redis_client = redis.Redis(connection_pool=connection_pool)
+
+# Pool for binary payloads that must not be decoded: msgpack chat history and LangGraph checkpoints
+binary_connection_pool = _pool(_binary_connections, decode_responses=False)
+
+binary_redis_client = redis.Redis(connection_pool=binary_connection_pool)
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from redis.exceptions import RedisError
+
+from backend.config import settings
+from backend.embedding_cache import normalize_text
+from backend.redis_client import redis_client
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query so that case, whitespace and trailing punctuation don't change the cache key.
+    """
+    return normalize_text(query).lower().rstrip("?!. ")
+
+
+def _generation_key(collection: str) -> str:
+    return f"retrieval-generation:{collection}"
+
+
+class RetrievalCache:
+    """
+    Two-tier cache of retrieval results: an in-process LRU in front of a Redis tier shared by every
+    worker.
+
+    Keys combine the textbook collection, the collection's index generation, the normalized query
+    and the search scope (chapter/section filter). Re-indexing a collection bumps its generation in
+    Redis, so earlier results are never served again and simply age out. Workers re-read the
+    generation at most every `generation_ttl` seconds.
+
+    Redis is only an optimization here: when it fails, lookups fall back to the in-process tier (or
+    straight to the retriever if the generation is unknown) instead of failing the chat.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, generation_ttl: float = 5.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation_ttl = generation_ttl
+        self._entries: "OrderedDict[str, Tuple[List[Document], float]]" = OrderedDict()
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _redis_failed(self, action: str, e: Exception) -> None:
+        self.errors += 1
+        print(f"Retrieval cache could not {action} Redis: {e}")
+
+    def key(self, collection: str, generation: int, query: str, scope: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(
+            json.dumps([normalize_query(query), scope], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"retrieval:{collection}:{generation}:{digest}"
+
+    def known_generation(self, collection: str) -> Optional[int]:
+        """
+        Returns the last generation this worker read for the collection, without asking Redis.
+        """
+        known = self._generations.get(collection)
+        return known[0] if known else None
+
+    async def generation(self, collection: str) -> Optional[int]:
+        """
+        Returns the collection's current generation, or None if it can't be read from Redis.
+        """
+        known = self._generations.get(collection)
+        if known and known[1] > time.monotonic():
+            return known[0]
+        try:
+            generation = int(await redis_client.get(_generation_key(collection)) or 0)
+        except RedisError as e:
+            self._redis_failed("read the generation from", e)
+            return None
+        self._generations[collection] = (generation, time.monotonic() + self.generation_ttl)
+        return generation
+
+    async def bump(self, collection: str) -> None:
+        """
+        Invalidates every cached result for a collection, e.g. after it was re-indexed.
+        """
+        try:
+            generation = await redis_client.incr(_generation_key(collection))
+        except RedisError as e:
+            # Other workers keep serving old results until they expire; this one drops its own
+            self._redis_failed("bump the generation in", e)
+            with self._lock:
+                self._entries.clear()
+            self._generations.pop(collection, None)
+            return
+        self._generations[collection] = (generation, time.monotonic() + self.generation_ttl)
+
+    def get_local(self, key: str) -> Optional[List[Document]]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or cached[1] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self.local_hits += 1
+            return cached[0]
+
+    def put_local(self, key: str, documents: List[Document]) -> None:
+        with self._lock:
+            self._entries[key] = (documents, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def aget(self, key: str) -> Optional[List[Document]]:
+        documents = self.get_local(key)
+        if documents is not None:
+            return documents
+        try:
+            stored = await redis_client.get(key)
+        except RedisError as e:
+            self._redis_failed("read from", e)
+            stored = None
+        if stored is None:
+            self.misses += 1
+            return None
+        self.redis_hits += 1
+        documents = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in json.loads(stored)]
+        self.put_local(key, documents)
+        return documents
+
+    async def aput(self, key: str, documents: List[Document]) -> None:
+        self.put_local(key, documents)
+        stored = json.dumps([{"page_content": d.page_content, "metadata": d.metadata} for d in documents])
+        try:
+            await redis_client.set(key, stored, ex=self.ttl)
+        except RedisError as e:
+            self._redis_failed("write to", e)
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "redis_errors": self.errors,
+            "generations": {collection: generation for collection, (generation, _) in self._generations.items()},
+        }
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Serves a textbook retriever's results from a RetrievalCache, so repeated or near-identical
+    queries skip embedding, the Chroma search and compression.
+
+    Search kwargs (the chapter/section `filter` from the retriever tool) are part of the key. The
+    async path uses both cache tiers; the sync path only the in-process one.
+    """
+
+    retriever: BaseRetriever
+    cache: Any
+    collection: str
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        generation = self.cache.known_generation(self.collection)
+        key = self.cache.key(self.collection, generation, query, kwargs) if generation is not None else None
+        documents = self.cache.get_local(key) if key else None
+        if documents is None:
+            self.cache.misses += 1
+            documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()}, **kwargs)
+            if key:
+                self.cache.put_local(key, documents)
+        return documents
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager, **kwargs: Any) -> List[Document]:
+        generation = await self.cache.generation(self.collection)
+        if generation is None:
+            self.cache.misses += 1
+            return await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()}, **kwargs)
+        key = self.cache.key(self.collection, generation, query, kwargs)
+        documents = await self.cache.aget(key)
+        if documents is None:
+            documents = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()}, **kwargs)
+            await self.cache.aput(key, documents)
+        return documents
+
+
+# One cache per process, shared by every loaded textbook's retriever tool
+retrieval_cache = RetrievalCache(
+    max_entries=settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+    ttl=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+)
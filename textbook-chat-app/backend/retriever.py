@@ -1,53 +1,275 @@
 import os
 import json
+import time
 
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_openai import OpenAIEmbeddings, OpenAI
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import DocumentCompressorPipeline, LLMChainFilter
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
+import threading
+
 import chromadb
+from chromadb.config import Settings as ChromaSettings
 
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PdfReader
 
 import backend.bookmark as bookmark
+import backend.extraction as extraction
+from backend.chunking import chunk_documents
+from backend.compressors import COMPRESSOR_MODES, BatchedLLMFilter, LexicalFilter
+from backend.catalog import TextbookNotIndexed
+from backend.config import settings
+from backend.embedding_cache import CachedEmbeddings
+from backend.ingestion import document_id, index_documents
+from backend.lexical_index import HybridRetriever, LexicalIndex, LexicalIndexBuilder, LexicalRetriever
 
 from dotenv import load_dotenv
-from tqdm import tqdm
 
-# Load .env file
+# Load .env file. A missing file is fine if the key is already in the environment; the key is
+# checked when a textbook is first loaded rather than at import time.
 env_path = os.path.join(os.path.dirname(__file__), ".env")
-if not load_dotenv(env_path):
-    raise Exception("Failed to load .env file") 
-else:
+if load_dotenv(env_path):
     print(".env file loaded")
 
-# Get OPENAI_API_KEY
-api_key = os.environ["OPENAI_API_KEY"]
-if not api_key:
-    raise Exception("OPENAI_API_KEY not found in .env file")
 
-os.environ["OPENAI_API_KEY"] = api_key
+def _require_api_key():
+    if not os.environ.get("OPENAI_API_KEY"):
+        raise Exception("OPENAI_API_KEY not found in the environment or .env file")
+
+_chroma_client = None
+_chroma_client_lock = threading.Lock()
+
+
+def get_chroma_client():
+    """
+    Returns the process-wide Chroma client.
+
+    With CHROMA_HOST set, every API worker and the ingestion worker talk to one shared Chroma server,
+    which is required when running more than one process. Otherwise the index is opened in-process
+    from CHROMA_PATH, and Chroma's LRU segment cache keeps loaded collections within
+    CHROMA_MEMORY_LIMIT_MB, so only the vectors of recently used textbooks stay in memory.
+    """
+    global _chroma_client
+    with _chroma_client_lock:
+        if _chroma_client is None and settings.CHROMA_HOST:
+            _chroma_client = chromadb.HttpClient(host=settings.CHROMA_HOST, port=settings.CHROMA_PORT)
+        elif _chroma_client is None:
+            _chroma_client = chromadb.PersistentClient(
+                path=settings.CHROMA_PATH,
+                settings=ChromaSettings(
+                    chroma_segment_cache_policy="LRU",
+                    chroma_memory_limit_bytes=settings.CHROMA_MEMORY_LIMIT_MB * 1024 * 1024,
+                ),
+            )
+    return _chroma_client
+
+
+_cached_embeddings = None
+_cached_embeddings_lock = threading.Lock()
+
+
+def _query_embeddings():
+    # Serving only embeds queries, which CachedEmbeddings doesn't cache anyway
+    _require_api_key()
+    return OpenAIEmbeddings(model="text-embedding-3-large")
+
+
+def _embeddings():
+    """
+    Returns the process-wide embedding cache used by ingestion, opening its SQLite file on first use.
+    """
+    global _cached_embeddings
+    with _cached_embeddings_lock:
+        if _cached_embeddings is None:
+            _cached_embeddings = CachedEmbeddings(
+                _query_embeddings(),
+                path=settings.EMBEDDING_CACHE_PATH,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+    return _cached_embeddings
+
+
+def _read_bookmarks(textbook_path):
+    """
+    Reads the PDF and builds its bookmarks, failing when the outline has no "Chapter N" entries,
+    since nothing outside a chapter is extracted.
+    """
+    reader = PdfReader(textbook_path)
+    bookmarks = bookmark.build_bookmarks(reader)
+    if not bookmarks["chapter_num"]:
+        raise ValueError(f"No \"Chapter N\" entries found in the PDF outline of {textbook_path}")
+    return reader, bookmarks
+
+
+def ingest_textbook(textbook_path, textbook_name, progress=None, resume_from_page=0):
+    """
+    Runs the ingestion pipeline for a textbook: bookmarks, extract, chunk, embed and index.
+
+    Args:
+        textbook_path (str): Path to the OpenStax textbook pdf
+        textbook_name (str): Name of the Chroma collection to fill
+        progress (Callable): Called as progress(stage, **fields) when a stage starts and after every
+            written batch, with pages_total, pages_processed, last_pdf_page and pages_per_sec
+        resume_from_page (int): 1-based PDF page to resume from after an interrupted run. Pages before
+            it are skipped; the page itself is re-indexed, which is safe because chunk ids are stable.
+            A fresh run over a collection that already has chunks re-indexes it incrementally instead.
+
+    Returns:
+        None
+    """
+    if not os.path.exists(textbook_path):
+        raise Exception("Textbook path does not exist")
+
+    collection = get_chroma_client().get_or_create_collection(name=textbook_name)
+    if not resume_from_page and collection.count() > 0:
+        # A full run over an indexed book would orphan every chunk that changed, so diff it instead
+        print(f"{textbook_name} is already indexed, re-indexing incrementally")
+        reindex_textbook(textbook_path, textbook_name, progress)
+        return
+
+    report = progress or (lambda stage, **fields: None)
+    embeddings = _embeddings()
+
+    # Build bookmarks and extract pages in memory
+    report("bookmarks")
+    reader, bookmarks = _read_bookmarks(textbook_path)
+    print("Bookmarks loaded")
+    # Keep the chapter/section structure so queries can be scoped to it later
+    bookmark.save_bookmarks(bookmarks, section_index_path(textbook_name))
+
+    book_pages = [
+        page + 1
+        for _, start_page, end_page in extraction.chapter_page_ranges(bookmarks, len(reader.pages))
+        for page in range(start_page, end_page)
+    ]
+    done = {page for page in book_pages if page < resume_from_page}
+    resumed_with = len(done)
+    started = time.perf_counter()
+    report("extract", pages_total=len(book_pages), pages_processed=len(done))
+
+    def on_batch(batch):
+        done.update(doc.metadata["pdf_page"] for doc in batch)
+        elapsed = time.perf_counter() - started
+        report(
+            "index",
+            pages_processed=len(done),
+            last_pdf_page=batch[-1].metadata["pdf_page"],
+            pages_per_sec=round((len(done) - resumed_with) / elapsed, 2) if elapsed > 0 else 0.0,
+        )
+
+    # Stream pages from the PDF straight into the vector database, building the lexical index alongside
+    documents = extraction.extract_documents(textbook_path, bookmarks, settings.EXTRACTION_WORKERS)
+    if resume_from_page:
+        print(f"Resuming ingestion of {textbook_name} from page {resume_from_page}")
+        documents = (doc for doc in documents if doc.metadata["pdf_page"] >= resume_from_page)
+    documents = chunk_documents(documents, settings.CHUNK_STRATEGY, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    lexical_builder = None if resume_from_page else LexicalIndexBuilder()
+    if lexical_builder:
+        documents = lexical_builder.track(documents)
+    index_documents(collection, embeddings, documents, on_batch=on_batch)
+    print(f"Embedding cache: {embeddings.stats()}")
+    if collection.count() == 0:
+        raise ValueError(f"No text could be extracted from the chapters of {textbook_path}")
+
+    report("lexical")
+    lexical_path = os.path.join(settings.LEXICAL_INDEX_DIR, textbook_name)
+    if lexical_builder:
+        lexical_builder.save(lexical_path)
+    else:
+        # A resumed run only saw part of the book, so index everything that was stored
+        build_lexical_index_from_collection(collection, lexical_path)
+
+
+def reindex_textbook(textbook_path, textbook_name, progress=None):
+    """
+    Incrementally re-indexes a textbook, e.g. after an errata release of a new edition.
+
+    Every chunk of the new PDF is fingerprinted and diffed against the ids already in the collection:
+    chunks that disappeared are deleted, new or changed chunks are embedded and added, and unchanged
+    chunks whose page or section moved only get their metadata updated. Nothing unchanged is re-embedded.
+
+    Args:
+        textbook_path (str): Path to the new textbook pdf
+        textbook_name (str): Name of the Chroma collection to update
+        progress (Callable): Called as progress(stage, **fields), like ingest_textbook
+
+    Returns:
+        dict: Number of chunks added, deleted, moved and unchanged
+    """
+    if not os.path.exists(textbook_path):
+        raise Exception("Textbook path does not exist")
+
+    report = progress or (lambda stage, **fields: None)
+    collection = get_chroma_client().get_or_create_collection(name=textbook_name)
+
+    report("bookmarks")
+    _, bookmarks = _read_bookmarks(textbook_path)
+    bookmark.save_bookmarks(bookmarks, section_index_path(textbook_name))
+
+    report("extract")
+    documents = extraction.extract_documents(textbook_path, bookmarks, settings.EXTRACTION_WORKERS)
+    documents = chunk_documents(documents, settings.CHUNK_STRATEGY, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    new = {}
+    for doc in documents:
+        new.setdefault(document_id(doc), doc)
+    if not new:
+        # Diffing against nothing would delete the whole book
+        raise ValueError(f"No text could be extracted from the chapters of {textbook_path}")
+
+    report("diff")
+    stored = collection.get(include=["metadatas"])
+    existing = dict(zip(stored["ids"], stored["metadatas"]))
+
+    deleted = [doc_id for doc_id in existing if doc_id not in new]
+    added = [doc for doc_id, doc in new.items() if doc_id not in existing]
+    moved = [doc_id for doc_id, doc in new.items() if doc_id in existing and existing[doc_id] != doc.metadata]
+    batch_size = settings.EMBEDDING_BATCH_SIZE * 8
+    for start in range(0, len(moved), batch_size):
+        ids = moved[start:start + batch_size]
+        collection.update(ids=ids, metadatas=[new[doc_id].metadata for doc_id in ids])
+
+    # The book is served throughout, so new chunks go in before the ones they replace come out
+    report("index", chunks_added=len(added), chunks_deleted=len(deleted), chunks_moved=len(moved))
+    if added:
+        index_documents(collection, _embeddings(), added)
+    for start in range(0, len(deleted), batch_size):
+        collection.delete(ids=deleted[start:start + batch_size])
+
+    report("lexical")
+    lexical_builder = LexicalIndexBuilder()
+    for doc in new.values():
+        lexical_builder.add(doc)
+    lexical_builder.save(os.path.join(settings.LEXICAL_INDEX_DIR, textbook_name))
+
+    summary = {"added": len(added), "deleted": len(deleted), "moved": len(moved),
+               "unchanged": len(new) - len(added) - len(moved)}
+    print(f"Re-indexed {textbook_name}: {summary}")
+    return summary
 
-def create_retriever(textbook_path, textbook_name):
+
+def create_retriever(textbook_path, textbook_name, compressor=None, ingest=True):
     """
     Creates a retriever given an OpenStax textbook pdf
 
     Args:
         textbook_path (str): Path to the OpenStax textbook pdf
         textbook_name (str): Name of the OpenStax textbook
+        compressor (str): Compression mode, defaults to settings.RETRIEVER_COMPRESSOR
+        ingest (bool): Ingest the textbook if its collection is empty, and build a missing lexical
+            index. When False, TextbookNotIndexed is raised instead, so the caller can queue
+            ingestion, and a book without a lexical index is served with vector search only.
 
     Returns:
-        ContextualCompressionRetriever
+        BaseRetriever
     """
 
     if not os.path.exists(textbook_path):
         raise Exception("Textbook path does not exist")
 
     # Initialize a persistent Chroma vector database
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-    persistent_client = chromadb.PersistentClient()
+    embeddings = _query_embeddings()
+    persistent_client = get_chroma_client()
     collection = persistent_client.get_or_create_collection(name=textbook_name)
 
     vector_store = Chroma(
@@ -57,85 +279,109 @@ def create_retriever(textbook_path, textbook_name):
     )
     print("Chroma vector database initialized")
 
+    lexical_path = os.path.join(settings.LEXICAL_INDEX_DIR, textbook_name)
+
     if collection.count() == 0:
+        if not ingest:
+            raise TextbookNotIndexed(textbook_name)
         print("Chroma vector database is empty, loading documents...")
-
-        # Initialize bookmarks
-        bookmark_str = textbook_name + ".json"
-        bookmark_path = os.path.join("./data", bookmark_str)
-        if not os.path.exists(bookmark_path):
-            bookmark.initialize_bookmarks(textbook_path, bookmark_path)
-        with open(bookmark_path, "r") as f:
-            bookmarks = json.load(f)
-        print("Bookmarks loaded")
-
-        # Create documents
-        documents = []
-
-        page_ranges = []
-        for i in range(1, bookmarks["chapter_num"]+1):
-            start_page = bookmarks[f"chapter {i}"]["page_num"]
-            end_page = bookmarks[f"chapter {i}"]["last_page"]
-            page_ranges.append((start_page - 1, end_page))
-
-        reader = PdfReader(textbook_path)
-
-        for idx, (start_page, end_page) in enumerate(page_ranges):
-            writer = PdfWriter()
-
-            for page_num in range(start_page, end_page):
-                writer.add_page(reader.pages[page_num])
-
-            output_pdf = os.path.join("./data", f"chapter{idx+1}.pdf")
-
-            with open(output_pdf, "wb") as f:
-                writer.write(f)
-
-        # Load documents
-        for i in tqdm(range(1, bookmarks["chapter_num"]+1), desc="Loading documents"):
-            file_path = f"./data/chapter{i}.pdf"
-            loader = PyPDFLoader(file_path)
-            full_chapter = loader.load()
-
-            for page_num, document in enumerate(full_chapter, start=1):
-                documents.append(
-                    Document(
-                        page_content=document.page_content, 
-                        metadata={"chapter": f"Chapter {i}", "page": page_num}
-                    )
-                )
-        print("Documents loaded")
-
-        # Remove redundant chapter PDFs
-        for i in range(1, bookmarks["chapter_num"]+1):
-            file_path = f"./data/chapter{i}.pdf"
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        print("Removed chapter PDFs")
-
-        # Remove bookmarks file
-        if os.path.exists(bookmark_path):
-            os.remove(bookmark_path)
-        print("Removed bookmarks file")
-
-        # Add documents to vector database
-        for doc in tqdm(documents, desc="Adding documents to vector database"):
-            vector_store.add_documents([doc])
+        ingest_textbook(textbook_path, textbook_name)
 
     else:
         print("Chroma vector database is not empty, skipping document loading")
+        if settings.RETRIEVER_HYBRID and not LexicalIndex.exists(lexical_path) and ingest:
+            # Collections indexed before the lexical index existed get one built from their stored pages
+            build_lexical_index_from_collection(collection, lexical_path)
+
+    hybrid = settings.RETRIEVER_HYBRID and LexicalIndex.exists(lexical_path)
+    if settings.RETRIEVER_HYBRID and not hybrid:
+        # Serving processes never write the index, so every API worker doesn't race to build it.
+        # The ingestion worker builds it on the book's next (incremental) ingestion.
+        print(f"No lexical index for {textbook_name} yet, using vector search only")
+    lexical_index = LexicalIndex(lexical_path) if hybrid else None
+    retriever = build_compression_retriever(vector_store, compressor or settings.RETRIEVER_COMPRESSOR, lexical_index)
+    print("Retriever initialized")
+
+    return retriever
+
+
+def section_index_path(textbook_name):
+    return os.path.join(settings.SECTION_INDEX_DIR, textbook_name + ".json")
+
+
+def load_section_index(textbook_name):
+    """
+    Returns the persisted chapter/section bookmarks for a textbook, or None if it hasn't been indexed.
+    """
+    return bookmark.load_bookmarks(section_index_path(textbook_name))
+
+
+def build_lexical_index_from_collection(collection, path):
+    """
+    Builds and saves a lexical index from the pages already stored in a Chroma collection.
+    """
+    stored = collection.get(include=["documents", "metadatas"])
+    builder = LexicalIndexBuilder()
+    for text, metadata in zip(stored["documents"], stored["metadatas"]):
+        builder.add(Document(page_content=text, metadata=metadata or {}))
+    builder.save(path)
+
+
+def build_compression_retriever(vector_store, mode, lexical_index=None):
+    """
+    Wraps the vector store retriever in the configured compression stage.
+
+    When a lexical index is given, vector and BM25 results are fused with reciprocal rank fusion
+    before compression.
+
+    Args:
+        vector_store (VectorStore): Vector store holding the textbook pages
+        mode (str): One of compressors.COMPRESSOR_MODES:
+            "llm" filters each document with its own LLM call,
+            "batched" filters all candidates in one LLM call,
+            "embedding" drops candidates below a similarity score, using the scores Chroma already computes,
+            "lexical" drops candidates with little query term overlap, scored locally,
+            "none" returns the raw search results
+        lexical_index (LexicalIndex): Optional BM25 index over the same pages
+
+    Returns:
+        BaseRetriever
+    """
+    if mode not in COMPRESSOR_MODES:
+        raise ValueError(f"Unknown compressor mode {mode!r}, expected one of {COMPRESSOR_MODES}")
+
+    if mode == "embedding":
+        base_retriever = vector_store.as_retriever(
+            search_type="similarity_score_threshold",
+            search_kwargs={"k": settings.RETRIEVER_K, "score_threshold": settings.RETRIEVER_SCORE_THRESHOLD},
+        )
+    else:
+        base_retriever = vector_store.as_retriever(search_kwargs={"k": settings.RETRIEVER_K})
+
+    if lexical_index is not None:
+        base_retriever = HybridRetriever(
+            vector_retriever=base_retriever,
+            lexical_retriever=LexicalRetriever(index=lexical_index, k=settings.RETRIEVER_K),
+            k=settings.RETRIEVER_K,
+            rrf_k=settings.RETRIEVER_RRF_K,
+        )
+
+    if mode in ("embedding", "none"):
+        return base_retriever
+
+    if mode == "llm":
+        llm = OpenAI(temperature=0)
+        filter = LLMChainFilter.from_llm(llm)
+    elif mode == "batched":
+        filter = BatchedLLMFilter(llm=OpenAI(temperature=0))
+    else:
+        filter = LexicalFilter(min_score=settings.RETRIEVER_LEXICAL_MIN_SCORE)
 
-    llm = OpenAI(temperature=0)
-    filter = LLMChainFilter.from_llm(llm)
     pipeline_compressor = DocumentCompressorPipeline(
         transformers=[filter]
     )
     retriever = ContextualCompressionRetriever(
         base_compressor=pipeline_compressor, 
-        base_retriever=vector_store.as_retriever(),
-        max_documents=6,
+        base_retriever=base_retriever,
     )
-    print("Retriever initialized")
-
     return retriever
-    
@@ -6,9 +6,9 @@ from datetime import datetime, timedelta
 import jwt
 from backend.models.user import User, UserCreate, UserInDB
 from backend.config import settings
+from backend.passwords import password_hasher
 from backend.redis_client import redis_client
-
-import hashlib
+from backend.user_cache import invalidate_user, is_disabled
 
 router = APIRouter()
 
@@ -23,9 +23,9 @@ class TokenData(BaseModel):
 # Helper functions
 async def hash_password(password: str) -> str:
     """
-    Hashes the password using SHA-256.
+    Hashes the password with bcrypt, off the event loop.
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    return await password_hasher.hash(password)
 
 async def store_user_in_redis(user: UserInDB):
     """
@@ -38,6 +38,8 @@ async def store_user_in_redis(user: UserInDB):
     user_data = user.model_dump()
     print("USSSSSSSEEEEEERRRRR DDDAAAATTTTTAAAA", user_data)
     await redis_client.hset(user_key, mapping=user_data)
+    # Workers cache users for a few seconds; make them all re-read this one
+    await invalidate_user(user.id)
     return True
 
 async def get_user_by_id(user_id: str) -> Optional[User]:
@@ -54,7 +56,7 @@ async def get_user_by_id(user_id: str) -> Optional[User]:
         id=user_data.get("id"),
         username=user_data.get("username"),
         email=user_data.get("email"),
-        disabled=user_data.get("disabled") == 1,
+        disabled=is_disabled(user_data.get("disabled")),
         hashed_password=user_data.get("hashed_password"),
     )
     
@@ -77,12 +79,19 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     """
     user = await get_user_by_id(form_data.username)
     
-    if not user or not user.hashed_password == await hash_password(form_data.password):
+    verified, needs_rehash = (False, False)
+    if user:
+        verified, needs_rehash = await password_hasher.verify(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if needs_rehash:
+        # Legacy SHA-256 hash or an old bcrypt cost: upgrade it now that we have the plain password
+        await redis_client.hset(f"user:{user.id}", "hashed_password", await hash_password(form_data.password))
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = await create_access_token(
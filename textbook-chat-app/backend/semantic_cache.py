@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class CacheEntry:
+    question: str
+    context: str
+    answer: str
+    vector: np.ndarray
+    created_at: float = field(default_factory=time.time)
+
+
+class _TextbookIndex:
+    """
+    Nearest-neighbour index over the cached questions of a single textbook, in LRU order.
+    """
+
+    def __init__(self) -> None:
+        self.entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._ids = []
+        self._matrix = None
+
+    def add(self, entry: CacheEntry) -> None:
+        self.entries[self._next_id] = entry
+        self._next_id += 1
+        self._matrix = None
+
+    def remove(self, entry_id: int) -> None:
+        del self.entries[entry_id]
+        self._matrix = None
+
+    def nearest(self, vector: np.ndarray):
+        if not self.entries:
+            return None, 0.0
+        if self._matrix is None:
+            # Rebuilt lazily after inserts/evictions; lookups are a single matrix-vector product
+            self._ids = list(self.entries.keys())
+            self._matrix = np.stack([self.entries[i].vector for i in self._ids])
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._ids[best], float(scores[best])
+
+
+class SemanticCache:
+    """
+    Caches answers per textbook and serves them for new questions whose embedding is close enough
+    to a previously answered one.
+
+    Entries expire after `ttl` seconds and each textbook keeps at most `max_entries`, evicting the
+    least recently used first. Any Embeddings implementation can be used, e.g. langchain_core's
+    DeterministicFakeEmbedding for local runs.
+    """
+
+    def __init__(self, embeddings, threshold: float, ttl: float, max_entries: int) -> None:
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._indexes: Dict[str, _TextbookIndex] = {}
+        self._lock = threading.Lock()
+
+    async def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, index: _TextbookIndex) -> None:
+        cutoff = time.time() - self.ttl
+        for entry_id in [i for i, e in index.entries.items() if e.created_at < cutoff]:
+            index.remove(entry_id)
+
+    async def alookup(self, textbook: str, question: str) -> Tuple[Optional[CacheEntry], np.ndarray]:
+        """
+        Returns the cached entry for the most similar question, if it clears the threshold, and the
+        question's embedding so a miss can be stored without embedding it again.
+        """
+        vector = await self._embed(question)
+        with self._lock:
+            index = self._indexes.get(textbook)
+            if index is not None:
+                self._expire(index)
+                entry_id, score = index.nearest(vector)
+                if entry_id is not None and score >= self.threshold:
+                    index.entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return index.entries[entry_id], vector
+            self.misses += 1
+            return None, vector
+
+    async def astore(self, textbook: str, question: str, context: str, answer: str,
+                     vector: Optional[np.ndarray] = None) -> None:
+        """
+        Adds an answered question to the textbook's index. Pass the vector returned by alookup to
+        skip embedding the question again.
+        """
+        if vector is None:
+            vector = await self._embed(question)
+        with self._lock:
+            index = self._indexes.setdefault(textbook, _TextbookIndex())
+            index.add(CacheEntry(question=question, context=context, answer=answer, vector=vector))
+            while len(index.entries) > self.max_entries:
+                index.remove(next(iter(index.entries)))
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": {name: len(index.entries) for name, index in self._indexes.items()},
+            }
@@ -1,10 +1,17 @@
+import asyncio
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from langchain_core.messages import ToolMessage
 from langchain_community.tools import tool
 #from retrievertool import generate_retriever_tool
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 from langchain.tools.retriever import create_retriever_tool
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
 import ast
 import re
 
@@ -12,36 +19,112 @@ import re
 class BasicToolNode:
     """
     A node that processes and executes tool requests embedded in the last AI message.
+
+    When the model asks for several tools at once they run concurrently: async tools on the event
+    loop, sync-only tools on a bounded thread pool. Each call gets `timeout` seconds from when it
+    was started (overridable per tool name in `timeouts`); a call that fails or times out becomes an
+    error ToolMessage instead of failing the others. Results are returned in the order of the AI
+    message's tool_calls, one per tool_call_id. A timed-out sync tool keeps its thread until it
+    returns, as threads can't be killed.
+
+    Pass a shared `executor` when many nodes are built, e.g. one graph per loaded textbook, so
+    their threads don't add up; otherwise the node starts its own pool of `max_workers` threads.
     """
 
-    def __init__(self, tools: list) -> None:
+    def __init__(self, tools: list, timeout: Optional[float] = None,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, max_workers: int = 4) -> None:
         # Create a dictionary of tools for easy access by their names.
         self.tools_by_name = {tool.name: tool for tool in tools}
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
 
-    def __call__(self, inputs: dict):
-        """
-        Process tool calls from the last AI message and execute them.
-        """
+    def _tool_calls(self, inputs: dict):
         if messages := inputs.get("messages", []):
             message = messages[-1]
         else:
             raise ValueError("No messages found in input.")
+        return message.tool_calls
 
-        outputs = []
+    def _timeout(self, name: str) -> Optional[float]:
+        return self.timeouts.get(name, self.timeout)
 
-        for tool_call in message.tool_calls:
-            tool_result = self.tools_by_name[tool_call["name"]].invoke(
-                tool_call["args"]
-            )
-            outputs.append(
-                ToolMessage(
-                    content=json.dumps(tool_result),
-                    name=tool_call["name"],
-                    tool_call_id=tool_call["id"],
-                )
+    @staticmethod
+    def _is_async(tool: BaseTool) -> bool:
+        # StructuredTool always overrides _arun, so check whether it was given a coroutine
+        if isinstance(tool, StructuredTool):
+            return tool.coroutine is not None
+        return type(tool)._arun is not BaseTool._arun
+
+    def _message(self, tool_call: dict, result=None, error: Optional[str] = None) -> ToolMessage:
+        if error is not None:
+            return ToolMessage(
+                content=json.dumps(f"Error: {error}"),
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                status="error",
             )
+        return ToolMessage(content=json.dumps(result), name=tool_call["name"], tool_call_id=tool_call["id"])
+
+    def _unknown(self, tool_call: dict) -> ToolMessage:
+        return self._message(tool_call, error=f"{tool_call['name']} is not a valid tool")
+
+    def __call__(self, inputs: dict):
+        """
+        Process tool calls from the last AI message and execute them concurrently on the thread pool.
+        """
+        tool_calls = self._tool_calls(inputs)
+        started = time.monotonic()
+        futures = [
+            self._executor.submit(self.tools_by_name[call["name"]].invoke, call["args"])
+            if call["name"] in self.tools_by_name else None
+            for call in tool_calls
+        ]
+
+        outputs = []
+        for tool_call, future in zip(tool_calls, futures):
+            if future is None:
+                outputs.append(self._unknown(tool_call))
+                continue
+            timeout = self._timeout(tool_call["name"])
+            # Every call started at submission, so earlier results waited on count against its timeout
+            remaining = None if timeout is None else max(started + timeout - time.monotonic(), 0)
+            try:
+                outputs.append(self._message(tool_call, future.result(timeout=remaining)))
+            except FutureTimeoutError:
+                outputs.append(self._message(tool_call, error=f"{tool_call['name']} timed out after {timeout}s"))
+            except Exception as e:
+                outputs.append(self._message(tool_call, error=str(e)))
         return {"messages": outputs}
-    
+
+    async def _arun(self, tool_call: dict) -> ToolMessage:
+        tool = self.tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return self._unknown(tool_call)
+
+        if self._is_async(tool):
+            pending = tool.ainvoke(tool_call["args"])
+        else:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(self._executor, tool.invoke, tool_call["args"])
+
+        timeout = self._timeout(tool_call["name"])
+        try:
+            return self._message(tool_call, await asyncio.wait_for(pending, timeout))
+        except asyncio.TimeoutError:
+            return self._message(tool_call, error=f"{tool_call['name']} timed out after {timeout}s")
+        except Exception as e:
+            return self._message(tool_call, error=str(e))
+
+    async def ainvoke(self, inputs: dict):
+        """
+        Process tool calls from the last AI message and execute them concurrently.
+        """
+        # gather returns results in call order, so messages line up with the tool_calls
+        outputs = await asyncio.gather(*(self._arun(call) for call in self._tool_calls(inputs)))
+        return {"messages": list(outputs)}
+
 # ==========================================================================================
 # Easily modify this list of tools to add or remove tools from the single agent.
 # We can also add new agents with their own tools, as long as we route them properly in the workflow.
@@ -58,16 +141,71 @@ class BasicToolNode:
 #     return sum(a,b)
 # ==========================================================================================
 
+class TextbookQuery(BaseModel):
+    query: str = Field(description="What to search the textbook for")
+    chapter: Optional[int] = Field(None, description="Only search this chapter number, e.g. 4")
+    section: Optional[str] = Field(None, description='Only search this section number, e.g. "4.3"')
+
+
+def scope_filter(chapter: Optional[int] = None, section: Optional[str] = None):
+    """
+    Builds a Chroma metadata filter restricting a search to a chapter and/or section.
+    """
+    conditions = []
+    if chapter is not None:
+        conditions.append({"chapter": f"Chapter {chapter}"})
+    if section:
+        conditions.append({"section": section})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def _describe_sections(sections):
+    chapters = [sections[f"chapter {i}"]["title"] for i in range(1, sections["chapter_num"] + 1)]
+    return " Chapters: " + "; ".join(chapters) + "."
+
+
+def create_scoped_retriever_tool(retriever, sections=None):
+    """
+    Creates the textbook retriever tool. The agent can pass a chapter and/or section number, which
+    becomes a metadata pre-filter so only that part of the book is searched.
+    """
+    def search_kwargs(chapter, section):
+        where = scope_filter(chapter, section)
+        return {"filter": where} if where else {}
+
+    def format_documents(documents):
+        return "\n\n".join(doc.page_content for doc in documents)
+
+    def retrieve(query: str, chapter: Optional[int] = None, section: Optional[str] = None) -> str:
+        return format_documents(retriever.invoke(query, **search_kwargs(chapter, section)))
+
+    async def aretrieve(query: str, chapter: Optional[int] = None, section: Optional[str] = None) -> str:
+        return format_documents(await retriever.ainvoke(query, **search_kwargs(chapter, section)))
+
+    description = (
+        "Search and return information from the textbook. "
+        "Pass a chapter and/or section number to search only that part of the book."
+    )
+    if sections:
+        description += _describe_sections(sections)
+
+    return StructuredTool.from_function(
+        func=retrieve,
+        coroutine=aretrieve,
+        name="retrieve_textbook_content",
+        description=description,
+        args_schema=TextbookQuery,
+    )
+
     
-def get_tools(retriever):
+def get_tools(retriever, sections=None):
     """
     Returns a list of tools for the chatbot.
     """    
     #textbook_retriever = generate_retriever_tool()
-    textbook_retriever_tool = create_retriever_tool(
-        retriever,
-        "retrieve_textbook_content",
-        "Search and return information from the textbook.")
+    textbook_retriever_tool = create_scoped_retriever_tool(retriever, sections)
     
     tools = [textbook_retriever_tool]#[textbook_retriever] 
     return tools
\ No newline at end of file
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from backend.config import settings
+from backend.models.user import UserIdentity
+from backend.redis_client import redis_client
+
+# Pub/sub channel carrying the ids of users whose record changed
+INVALIDATION_CHANNEL = "user-invalidate"
+
+
+async def fetch_identity(user_id: str) -> Optional[UserIdentity]:
+    """
+    Reads just the fields auth needs from the user's Redis hash, leaving out the password hash.
+    """
+    found_id, username, disabled = await redis_client.hmget(f"user:{user_id}", "id", "username", "disabled")
+    if found_id is None:
+        return None
+    return UserIdentity(id=found_id, username=username, disabled=is_disabled(disabled))
+
+
+def is_disabled(value) -> bool:
+    # Redis returns the stored flag as a string ("0"/"1")
+    return str(value) in ("1", "True")
+
+
+class UserCache:
+    """
+    Short-lived in-process cache of UserIdentity records, so authenticated requests don't do a Redis
+    round-trip for every chat message.
+
+    Entries expire after `ttl` seconds and at most `max_entries` are kept, least recently used first
+    out. When a user record changes, invalidate_user() drops it here and publishes the id on Redis so every
+    other worker drops it too; the TTL bounds staleness if a message is missed.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[UserIdentity, float]]" = OrderedDict()
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, user_id: str) -> Optional[UserIdentity]:
+        """
+        Returns the user's identity, or None if the user doesn't exist.
+        """
+        cached = self._entries.get(user_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        identity = await fetch_identity(user_id)
+        if identity is None:
+            self._entries.pop(user_id, None)
+            return None
+        self._entries[user_id] = (identity, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return identity
+
+    def discard(self, user_id: str) -> None:
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    async def start(self) -> None:
+        """
+        Starts listening for invalidations published by other workers.
+        """
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                while True:
+                    # Short polls stay inside the Redis socket timeout
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.discard(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries expire on their own, so keep serving and resubscribe
+                print(f"User cache invalidation listener failed: {e}")
+                self._entries.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+# One cache per process, shared by the auth dependencies in main and the auth routes
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL_SECONDS, max_entries=settings.USER_CACHE_MAX_ENTRIES)
+
+
+async def invalidate_user(user_id: str) -> None:
+    """
+    Drops a user from this worker's cache and tells every other worker to do the same.
+    """
+    user_cache.discard(user_id)
+    await redis_client.publish(INVALIDATION_CHANNEL, user_id)
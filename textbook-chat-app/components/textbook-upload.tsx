@@ -69,8 +69,11 @@ export default function TextbookUpload() {
       formData.append("title", title)
       formData.append("author", author)
 
+      // The backend only queues indexing for a logged-in user, so pass the token along
+      const token = localStorage.getItem("access_token")
       const response = await fetch("/api/textbooks/upload", {
         method: "POST",
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
         body: formData,
       })
 